@@ -24,6 +24,9 @@ export DJANGO_SETTINGS_MODULE="pyquizz.settings"
 python -Wd ./manage.py collectstatic --noinput
 python -Wd ./manage.py makemigrations
 python -Wd ./manage.py migrate
+python -Wd ./manage.py render_questions
+python -Wd ./manage.py rescore_answers
+python -Wd ./manage.py reconcile_counters
 
 echo -e "\e[1m"  # bold
 echo -e "\e[97m" # white foreground
@@ -1,6 +1,13 @@
+import hashlib
+
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Prefetch
+from django.utils.functional import cached_property
 from django.utils.html import format_html, format_html_join
 
 from .models import Answer, Group, Profile, Question, Quizz, QuizzSending, ReviewAnswer
@@ -37,6 +44,25 @@ def format_list(generator):
     )
 
 
+class CachedCountPaginator(Paginator):
+    """Paginator keeping the number of rows of a query in the cache for a while.
+
+    Counting millions of rows on every page of a changelist is too slow, a
+    count a few minutes old is good enough to browse them.
+    """
+
+    @cached_property
+    def count(self):
+        query = str(self.object_list.query).encode()
+        key = "admin-count-" + hashlib.sha1(query).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            timeout = getattr(settings, "QUIZZ_ADMIN_COUNT_TIMEOUT", 5 * 60)
+            cache.set(key, count, timeout)
+        return count
+
+
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
     prepopulated_fields = {"slug": ("name",)}
@@ -59,9 +85,19 @@ class QuestionAdmin(admin.ModelAdmin):
         return format_list(obj.correct_answers_text)
 
 
-    list_display = ("statement", "quizzes_display", "answers_display")
+    list_display = ("statement", "quizzes_display", "answers_display", "needs_rescoring")
+    list_filter = ("needs_rescoring",)
     prepopulated_fields = {"slug": ("statement",)}
 
+    def get_queryset(self, request):
+        # str(quizz) shows its number of questions
+        quizzes = Quizz.objects.with_nb_questions()
+        return (
+            super()
+            .get_queryset(request)
+            .prefetch_related(Prefetch("quizzes", queryset=quizzes))
+        )
+
 
 @admin.register(Quizz)
 class QuizzAdmin(admin.ModelAdmin):
@@ -76,10 +112,28 @@ class QuizzAdmin(admin.ModelAdmin):
     prepopulated_fields = {"slug": ("name",)}
     filter_horizontal = ("questions",)
 
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .with_nb_questions()
+            .prefetch_related("questions")
+        )
+
 
 @admin.register(QuizzSending)
 class QuizzSendingAdmin(admin.ModelAdmin):
     list_display = ("date", "quizz", "group")
+    list_select_related = ("group",)
+
+    def get_queryset(self, request):
+        # str(quizz) shows its number of questions
+        quizzes = Quizz.objects.with_nb_questions()
+        return (
+            super()
+            .get_queryset(request)
+            .prefetch_related(Prefetch("quizz", queryset=quizzes))
+        )
 
 
 @admin.register(Answer)
@@ -88,7 +142,7 @@ class AnswerAdmin(admin.ModelAdmin):
         description="quizz"
     )
     def quizz_sending_quizz(self, obj):
-        return str(obj.quizz_sending.quizz)
+        return obj.quizz_sending.quizz.name
 
 
     @admin.display(
@@ -111,9 +165,25 @@ class AnswerAdmin(admin.ModelAdmin):
         "person",
         "question",
         "answers_display",
-        "quizz_sending",
+        "quizz_sending__date",
     )
-    search_fields = ("person__email", "quizz_sending__quizz__name")
+    list_select_related = ("quizz_sending__group", "person", "question")
+    # the default ordering joins the sendings, ordering by primary key does not
+    ordering = ("-pk",)
+    search_fields = ("=person__email", "^quizz_sending__quizz__name")
+    date_hierarchy = "answered_at"
+    paginator = CachedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # str(answer), in the label of the checkbox of each row, shows the
+        # number of questions of the quizz
+        quizzes = Quizz.objects.with_nb_questions()
+        return (
+            super()
+            .get_queryset(request)
+            .prefetch_related(Prefetch("quizz_sending__quizz", queryset=quizzes))
+        )
 
 
 @admin.register(ReviewAnswer)
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class QuizzConfig(AppConfig):
     name = "quizz"
+
+    def ready(self):
+        # connect the signal receivers
+        from . import checks, database, snapshots, started, statistics  # noqa: F401
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+# backends whose entries are only seen by the process which wrote them
+PROCESS_LOCAL_CACHES = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """The snapshots of running quizzes and their invalidation need a shared cache.
+
+    Otherwise a quizz closed early in the admin is only closed for the
+    process which saved it, the others keep accepting answers.
+    """
+    backend = settings.CACHES["default"]["BACKEND"]
+    if settings.DEBUG or backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        Error(
+            f"The cache backend {backend} is not shared by the processes of the site.",
+            hint="Use a file, redis or memcached cache, see CACHES in the settings.",
+            id="quizz.E001",
+        )
+    ]
@@ -0,0 +1,43 @@
+"""Tuning of the SQLite connections.
+
+The pragmas of the SQLITE_PRAGMAS setting are applied to each new
+connection, and can be overridden with the SQLITE_PRAGMAS environment
+variable, such as "synchronous=full;mmap_size=0".
+"""
+
+import os
+import re
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+PRAGMA_NAME = re.compile(r"^[a-z_]+$")
+PRAGMA_VALUE = re.compile(r"^-?\w+$")
+
+
+def parse_pragmas(text):
+    pragmas = {}
+    for item in text.split(";"):
+        if item.strip():
+            name, _, value = item.partition("=")
+            pragmas[name.strip().lower()] = value.strip()
+    return pragmas
+
+
+def sqlite_pragmas():
+    pragmas = dict(getattr(settings, "SQLITE_PRAGMAS", {}))
+    pragmas.update(parse_pragmas(os.getenv("SQLITE_PRAGMAS", "")))
+    for name, value in pragmas.items():
+        if not PRAGMA_NAME.match(name) or not PRAGMA_VALUE.match(str(value)):
+            raise ValueError(f"Invalid SQLite pragma: {name}={value}")
+    return pragmas
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in sqlite_pragmas().items():
+            cursor.execute(f"PRAGMA {name} = {value}")
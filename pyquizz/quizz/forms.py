@@ -1,16 +1,28 @@
-from datetime import datetime
+from datetime import date, datetime, time, timedelta
 
 from django import forms
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator
-from django.utils.timezone import get_fixed_timezone
+from django.db.models import Exists, OuterRef, Subquery
+from django.utils.timezone import get_fixed_timezone, make_aware
 
-from .models import Answer, Profile, Question, QuizzSending, ReviewAnswer
+from .models import (
+    Answer,
+    Group,
+    Profile,
+    Question,
+    Quizz,
+    QuizzSending,
+    ReviewAnswer,
+)
+from .writer import save_answer
+
+# number of answerN fields of AnswerForm
+NB_ANSWERS = 10
 
 
 class AnswerForm(forms.Form):
-    email = forms.CharField(max_length=255)
     question = forms.IntegerField(min_value=0)
     quizz_sending = forms.IntegerField(min_value=0)
     answer0 = forms.BooleanField(required=False)
@@ -24,68 +36,90 @@ class AnswerForm(forms.Form):
     answer8 = forms.BooleanField(required=False)
     answer9 = forms.BooleanField(required=False)
 
-    def clean_email(self):
-        email = self.cleaned_data["email"]
-        if not User.objects.filter(email=email):
-            raise forms.ValidationError("Cet email est inconnu.")
-        return email
+    def __init__(self, *args, person=None, snapshot=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.person = person
+        self.snapshot = snapshot
+        self.answer = None
+
+    def get_quizz_sending(self, quizz_sending_pk, question_pk):
+        """Return the sending, whether the person belongs to it and the question.
+
+        The question is None when it is not part of the quizz, else it only
+        holds what is needed to score the answer.
+        """
+        snapshot = self.snapshot
+        if snapshot is not None and snapshot.quizz_sending.pk == quizz_sending_pk:
+            return (
+                snapshot.quizz_sending,
+                self.person.pk in snapshot.roster,
+                snapshot.questions.get(question_pk),
+            )
+        quizz_question = Quizz.questions.through.objects.filter(
+            quizz=OuterRef("quizz"), question=question_pk
+        )
+        quizz_sending = (
+            QuizzSending.objects.filter(pk=quizz_sending_pk)
+            .annotate(
+                is_recipient=Exists(
+                    Group.persons.through.objects.filter(
+                        group=OuterRef("group"), user=self.person
+                    )
+                ),
+                correct_answers_mask=Subquery(
+                    quizz_question.values("question__correct_answers_mask")[:1]
+                ),
+                auto_evaluation=Subquery(
+                    quizz_question.values("question__auto_evaluation")[:1]
+                ),
+            )
+            .first()
+        )
+        if quizz_sending is None:
+            return None, False, None
+        question = None
+        if quizz_sending.correct_answers_mask is not None:
+            question = Question(
+                pk=question_pk,
+                correct_answers_mask=quizz_sending.correct_answers_mask,
+                auto_evaluation=quizz_sending.auto_evaluation,
+            )
+        return quizz_sending, quizz_sending.is_recipient, question
 
     def clean(self):
         cleaned_data = super().clean()
-        if "quizz_sending" not in cleaned_data:
+        if "quizz_sending" not in cleaned_data or "question" not in cleaned_data:
+            raise forms.ValidationError("Ce quizz n'existe pas. Vérifiez la date.")
+        quizz_sending, is_recipient, question = self.get_quizz_sending(
+            cleaned_data["quizz_sending"], cleaned_data["question"]
+        )
+        if quizz_sending is None:
             raise forms.ValidationError("Ce quizz n'existe pas. Vérifiez la date.")
-        if "email" not in cleaned_data:
-            raise forms.ValidationError("Cet email est inconnu.")
-        quizz_sending = QuizzSending.objects.get(pk=cleaned_data["quizz_sending"])
-        if not quizz_sending.group.persons.filter(email=cleaned_data["email"]):
+        if not is_recipient:
             raise forms.ValidationError("Ce quizz n'est pas fait pour vous.")
-        if not any(
-            (
-                self.cleaned_data["answer0"],
-                self.cleaned_data["answer1"],
-                self.cleaned_data["answer2"],
-                self.cleaned_data["answer3"],
-                self.cleaned_data["answer4"],
-                self.cleaned_data["answer5"],
-                self.cleaned_data["answer6"],
-                self.cleaned_data["answer7"],
-                self.cleaned_data["answer8"],
-                self.cleaned_data["answer9"],
-            )
-        ):
+        if question is None:
+            raise forms.ValidationError("Cette question ne fait pas partie du quizz.")
+
+        answers = [
+            index for index in range(NB_ANSWERS) if cleaned_data[f"answer{index}"]
+        ]
+        if not answers:
             raise forms.ValidationError("Aucune réponse n'a été fournie.")
-        already_given_answers = (
-            Answer.objects.filter(quizz_sending=quizz_sending)
-            .filter(person=User.objects.get(email=self.cleaned_data["email"]))
-            .filter(question=Question.objects.get(pk=self.cleaned_data["question"]))
-        )
-        if already_given_answers:
-            raise forms.ValidationError(
-                "Une réponse a déjà été fournie à la question précédente."
-            )
 
         if datetime.now(tz=get_fixed_timezone(1)) > quizz_sending.end_date:
             raise forms.ValidationError("Ce quiz est maintenant terminé")
 
-    def add_answer_in_database(self):
-        quizz_sending = QuizzSending.objects.get(pk=self.cleaned_data["quizz_sending"])
-        person = User.objects.get(email=self.cleaned_data["email"])
-        question = Question.objects.get(pk=self.cleaned_data["question"])
-
-        answers = []
-        for index in range(10):
-            answer = self.cleaned_data[f"answer{index}"]
-            if answer:
-                answers.append(index)
-        answers = ",".join(str(answer) for answer in answers)
-
-        answer = Answer(
+        self.answer = Answer.from_indexes(
+            answers,
+            question,
             quizz_sending=quizz_sending,
-            person=person,
-            question=question,
-            answers=answers,
+            person=self.person,
         )
-        answer.save()
+        return cleaned_data
+
+    def add_answer_in_database(self):
+        """Insert the answer, return False if the question was already answered."""
+        return save_answer(self.answer)
 
 
 class ReviewForm(forms.ModelForm):
@@ -126,3 +160,78 @@ class UploadZipFileForm(forms.Form):
         if "zip" not in data.content_type:
             raise ValidationError(f"Invalid content type: {data.content_type}")
         return data
+
+
+def academic_year(day):
+    """Year at the start of the academic year of day, which starts in September."""
+    return day.year if day.month >= 9 else day.year - 1
+
+
+def start_of_day(day):
+    """Aware datetime at midnight of day, in the current time zone."""
+    return make_aware(datetime.combine(day, time.min))
+
+
+class QuizzSendingFilterForm(forms.Form):
+    group = forms.ModelChoiceField(
+        queryset=Group.objects.all(),
+        required=False,
+        label="groupe",
+        empty_label="tous les groupes",
+    )
+    academic_year = forms.TypedChoiceField(
+        coerce=int,
+        required=False,
+        empty_value=None,
+        label="année scolaire",
+    )
+    date_from = forms.DateField(
+        required=False,
+        label="du",
+        widget=forms.DateInput(attrs={"type": "date"}),
+    )
+    date_to = forms.DateField(
+        required=False,
+        label="au",
+        widget=forms.DateInput(attrs={"type": "date"}),
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        years = sorted(
+            {
+                academic_year(month)
+                for month in QuizzSending.objects.dates("date", "month")
+            },
+            reverse=True,
+        )
+        self.fields["academic_year"].choices = [("", "toutes les années")] + [
+            (year, f"{year}-{year + 1}") for year in years
+        ]
+
+    def filter(self, quizz_sendings):
+        """Sendings matching the valid filters.
+
+        The dates are compared with datetime bounds rather than with the
+        date of the column, which could not use its index.
+        """
+        if not self.is_valid():
+            return quizz_sendings
+        data = self.cleaned_data
+        if data["group"]:
+            quizz_sendings = quizz_sendings.filter(group=data["group"])
+        if data["academic_year"] is not None:
+            year = data["academic_year"]
+            quizz_sendings = quizz_sendings.filter(
+                date__gte=start_of_day(date(year, 9, 1)),
+                date__lt=start_of_day(date(year + 1, 9, 1)),
+            )
+        if data["date_from"]:
+            quizz_sendings = quizz_sendings.filter(
+                date__gte=start_of_day(data["date_from"])
+            )
+        if data["date_to"]:
+            quizz_sendings = quizz_sendings.filter(
+                date__lt=start_of_day(data["date_to"] + timedelta(days=1))
+            )
+        return quizz_sendings
@@ -0,0 +1,116 @@
+"""Grades of the students of a group for every quizz sent to it."""
+
+import numpy as np
+from django.db.models import Count, Sum
+
+from .models import Answer, QuizzSending
+from .statistics import group_names
+
+
+def competition_ranks(values):
+    """Rank of each value, highest first, equal values sharing a rank (1, 2, 2, 4)."""
+    ordered = np.sort(-values)
+    return np.searchsorted(ordered, -values, side="left") + 1
+
+
+def positions(keys, values):
+    """Position of each value in keys, and whether it was found."""
+    keys = np.array(keys, dtype=float)
+    if not keys.size:
+        return np.zeros(len(values), dtype=int), np.zeros(len(values), dtype=bool)
+    by_key = np.argsort(keys)
+    found = np.searchsorted(keys, values, sorter=by_key).clip(max=keys.size - 1)
+    indexes = by_key[found]
+    return indexes, keys[indexes] == values
+
+
+class Gradebook:
+    """Matrix of the grades out of 20, one row per student, one column per sending.
+
+    A student who did not answer a question of a sending gets 0 for it,
+    like in the CSV export of the sending.
+    """
+
+    def __init__(self, group):
+        self.group = group
+        self.quizz_sendings = list(
+            QuizzSending.objects.filter(group=group, started=True)
+            .select_related("quizz")
+            .annotate(nb_questions=Count("quizz__questions"))
+            .order_by("date")
+        )
+        names = group_names(group)
+        self.person_pks = sorted(names, key=names.get)
+        self.names = [names[pk] for pk in self.person_pks]
+
+        points = np.zeros((len(self.person_pks), len(self.quizz_sendings)))
+        totals = (
+            Answer.objects.filter(quizz_sending__in=self.quizz_sendings)
+            .order_by()
+            .values_list("person", "quizz_sending")
+            .annotate(total=Sum("points"))
+        )
+        cells = np.array(list(totals), dtype=float).reshape(-1, 3)
+        rows, known_persons = positions(self.person_pks, cells[:, 0])
+        columns, _ = positions(
+            [quizz_sending.pk for quizz_sending in self.quizz_sendings], cells[:, 1]
+        )
+        # answers of former members of the group are left out
+        points[rows[known_persons], columns[known_persons]] = cells[known_persons, 2]
+
+        nb_questions = np.array(
+            [
+                max(1, quizz_sending.nb_questions)
+                for quizz_sending in self.quizz_sendings
+            ],
+            dtype=float,
+        )
+        self.grades = 20 * points / nb_questions
+
+    @property
+    def has_grades(self):
+        return self.grades.size > 0
+
+    @property
+    def students_mean(self):
+        return self.grades.mean(axis=1) if self.has_grades else self.empty_rows()
+
+    @property
+    def students_median(self):
+        return np.median(self.grades, axis=1) if self.has_grades else self.empty_rows()
+
+    @property
+    def students_rank(self):
+        return competition_ranks(np.round(self.students_mean, 6))
+
+    @property
+    def sendings_mean(self):
+        return self.grades.mean(axis=0) if self.has_grades else self.empty_columns()
+
+    @property
+    def sendings_std(self):
+        return self.grades.std(axis=0) if self.has_grades else self.empty_columns()
+
+    def empty_rows(self):
+        return np.zeros(len(self.person_pks))
+
+    def empty_columns(self):
+        return np.zeros(len(self.quizz_sendings))
+
+    def students(self):
+        """Name, grades, mean, median and rank of each student."""
+        return zip(
+            self.names,
+            np.round(self.grades, 2).tolist(),
+            np.round(self.students_mean, 2).tolist(),
+            np.round(self.students_median, 2).tolist(),
+            self.students_rank.tolist(),
+        )
+
+    def sendings(self):
+        """Sending, mean and standard deviation of each sending."""
+        return zip(
+            self.quizz_sendings,
+            np.round(self.sendings_mean, 2).tolist(),
+            np.round(self.sendings_std, 2).tolist(),
+        )
@@ -0,0 +1,270 @@
+"""Classroom burst: a whole group answering a quizz as soon as it starts.
+
+The students are simulated by threads driving AnswerAQuestion with the
+test client, against a throwaway SQLite database file and a throwaway
+file cache, and every request is timed. The classroom gets the primary
+keys of real groups, sendings and students: with the site's database or
+cache, its entries would replace theirs.
+"""
+
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection, connections
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from .database import sqlite_pragmas
+from .models import Group, Profile, Question, Quizz, QuizzSending
+from .writer import answer_writer
+
+
+class RequestLog:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.durations = {}
+        self.queries = {}
+        self.lock_errors = 0
+        self.errors = 0
+
+    def add(self, kind, duration, nb_queries):
+        with self.lock:
+            self.durations.setdefault(kind, []).append(duration)
+            self.queries.setdefault(kind, []).append(nb_queries)
+
+    def add_error(self, error):
+        with self.lock:
+            if isinstance(error, OperationalError) and "locked" in str(error):
+                self.lock_errors += 1
+            else:
+                self.errors += 1
+
+
+def percentiles(values):
+    if len(values) < 2:
+        return {"p50": values[0], "p95": values[0], "p99": values[0]}
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
+
+
+def create_classroom(nb_students, nb_questions):
+    group = Group.objects.create(name="loadtest", slug="loadtest")
+    students = User.objects.bulk_create(
+        User(username=f"student{i}", email=f"student{i}@loadtest.invalid")
+        for i in range(nb_students)
+    )
+    Profile.objects.bulk_create(Profile(user=student) for student in students)
+    group.persons.add(*students)
+    quizz = Quizz.objects.create(name="loadtest", slug="loadtest")
+    questions = []
+    for i in range(nb_questions):
+        question = Question(
+            statement=f"Question {i} : que vaut `{i} + 1` ?",
+            slug=f"loadtest-{i}",
+            answers="----".join(str(i + offset) for offset in range(4)),
+            correct_answers="1",
+        )
+        question.save()
+        questions.append(question)
+    quizz.questions.add(*questions)
+    now = timezone.now().replace(second=0, microsecond=0)
+    quizz_sending = QuizzSending.objects.create(
+        quizz=quizz,
+        group=group,
+        date=now,
+        end_date=now + timedelta(hours=2),
+        started=True,
+    )
+    return students, quizz_sending
+
+
+def timed(log, kind, request, *args, **kwargs):
+    """Run a request, retrying while the database is locked."""
+    while True:
+        start = time.perf_counter()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                response = request(*args, secure=True, **kwargs)
+        except OperationalError as error:
+            log.add_error(error)
+            if "locked" not in str(error):
+                raise
+            continue
+        log.add(kind, time.perf_counter() - start, len(queries))
+        return response
+
+
+def answer_the_quizz(client, url, quizz_sending, start, log, bulk):
+    rng = random.Random(client.session["_auth_user_id"])
+    start.wait()
+    try:
+        if bulk:
+            # the page gives the questions, the answers are sent at once
+            answers = {}
+            for question in quizz_sending.quizz.questions.all():
+                answers[question.pk] = rng.sample(range(5), rng.randint(1, 2))
+            timed(log, "GET", client.get, url)
+            timed(
+                log,
+                "POST",
+                client.post,
+                url + "reponses/",
+                json.dumps({"answers": answers}),
+                content_type="application/json",
+            )
+            return
+        while True:
+            response = timed(log, "GET", client.get, url)
+            question = response.context.get("question")
+            if question is None:
+                return
+            data = {"question": question.pk, "quizz_sending": quizz_sending.pk}
+            for index in rng.sample(range(5), rng.randint(1, 2)):
+                data[f"answer{index}"] = "on"
+            timed(log, "POST", client.post, url, data)
+    except Exception as error:  # noqa: BLE001 (reported, not raised)
+        log.add_error(error)
+    finally:
+        connection.close()
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_load_test(
+    nb_students=30,
+    nb_questions=40,
+    bulk=False,
+    group_commit=False,
+    pragmas=None,
+    transaction_mode=None,
+    nb_statistics=20,
+):
+    """Simulate the burst on a temporary database, return the report.
+
+    pragmas and transaction_mode replace the SQLite settings when given.
+    """
+    sqlite_settings = {}
+    if pragmas is not None:
+        sqlite_settings["SQLITE_PRAGMAS"] = pragmas
+    options = connection.settings_dict.setdefault("OPTIONS", {})
+    old_options = dict(options)
+    if transaction_mode is not None:
+        options["transaction_mode"] = transaction_mode
+    with override_settings(**sqlite_settings):
+        try:
+            report = burst(nb_students, nb_questions, bulk, group_commit, nb_statistics)
+        finally:
+            options.clear()
+            options.update(old_options)
+    report["sqlite"] = {
+        "pragmas": sqlite_pragmas(),
+        "transaction_mode": options.get("transaction_mode"),
+    }
+    if pragmas is not None:
+        report["sqlite"]["pragmas"] = pragmas
+    if transaction_mode is not None:
+        report["sqlite"]["transaction_mode"] = transaction_mode
+    return report
+
+
+def burst(nb_students, nb_questions, bulk, group_commit, nb_statistics):
+    # captured queries would otherwise go to the debug log file
+    logging.getLogger("django.db.backends").setLevel(logging.INFO)
+    setup_test_environment()
+    database_dir = tempfile.mkdtemp(prefix="pyquizz-loadtest-")
+    connection.settings_dict["TEST"]["NAME"] = os.path.join(database_dir, "db")
+    old_name = connection.creation.create_test_db(verbosity=0, serialize=False)
+    cache_settings = override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": os.path.join(database_dir, "cache"),
+            }
+        }
+    )
+    cache_settings.enable()
+    try:
+        students, quizz_sending = create_classroom(nb_students, nb_questions)
+        url = reverse("form", args=[quizz_sending.date_for_url])
+        log = RequestLog()
+        start = threading.Barrier(nb_students)
+        threads = []
+        for student in students:
+            client = Client()
+            client.force_login(student)
+            threads.append(
+                threading.Thread(
+                    target=answer_the_quizz,
+                    args=(client, url, quizz_sending, start, log, bulk),
+                )
+            )
+        begin = time.perf_counter()
+        with override_settings(QUIZZ_GROUP_COMMIT=group_commit):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        duration = time.perf_counter() - begin
+        nb_answers = quizz_sending.answers.count()
+
+        # the teacher then looks at the statistics of the quizz
+        client = Client()
+        url = reverse("quizz_statistics", args=[quizz_sending.date_for_url])
+        os.mkdir(os.path.join(database_dir, "qrcodes"))
+        with override_settings(MEDIA_ROOT=database_dir):
+            for _ in range(nb_statistics):
+                timed(log, "statistics", client.get, url)
+    finally:
+        answer_writer.stop()
+        cache_settings.disable()
+        connections.close_all()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    nb_requests = sum(len(log.durations[kind]) for kind in ("GET", "POST"))
+    return {
+        "commit": git_commit(),
+        "date": timezone.now().isoformat(),
+        "students": nb_students,
+        "questions": nb_questions,
+        "bulk": bulk,
+        "group_commit": group_commit,
+        "duration": duration,
+        "requests": nb_requests,
+        "throughput": nb_requests / duration,
+        "answers": nb_answers,
+        "lock_errors": log.lock_errors,
+        "errors": log.errors,
+        "latency": {
+            kind: percentiles(durations) for kind, durations in log.durations.items()
+        },
+        "queries_per_request": {
+            kind: statistics.mean(queries) for kind, queries in log.queries.items()
+        },
+    }
@@ -0,0 +1,46 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from quizz.loadtest import run_load_test
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the answer inserts committed by each request with the "
+        "group commit writer, on the classroom load test."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=30)
+        parser.add_argument("--questions", type=int, default=40)
+        parser.add_argument("--output", help="JSON file receiving both reports")
+
+    def handle(self, *args, **options):
+        reports = {
+            name: run_load_test(
+                nb_students=options["students"],
+                nb_questions=options["questions"],
+                group_commit=group_commit,
+            )
+            for name, group_commit in (("per_request", False), ("group_commit", True))
+        }
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                json.dump(reports, output, indent=2)
+
+        self.stdout.write(f"{'':24}{'per request':>14}{'group commit':>14}")
+        rows = (
+            ("throughput (req/s)", lambda r: r["throughput"]),
+            ("POST p50 (ms)", lambda r: 1000 * r["latency"]["POST"]["p50"]),
+            ("POST p95 (ms)", lambda r: 1000 * r["latency"]["POST"]["p95"]),
+            ("POST p99 (ms)", lambda r: 1000 * r["latency"]["POST"]["p99"]),
+            ("locked retries", lambda r: r["lock_errors"]),
+            ("answers", lambda r: r["answers"]),
+        )
+        for label, value in rows:
+            self.stdout.write(
+                f"{label:24}"
+                f"{value(reports['per_request']):>14.1f}"
+                f"{value(reports['group_commit']):>14.1f}"
+            )
@@ -0,0 +1,53 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from quizz.loadtest import run_load_test
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the classroom load test without tuning, with each SQLite "
+        "setting alone and with the whole profile of the settings."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=30)
+        parser.add_argument("--questions", type=int, default=40)
+        parser.add_argument("--output", help="JSON file receiving the reports")
+
+    def variants(self):
+        profile = settings.SQLITE_PRAGMAS
+        profile_mode = settings.DATABASES["default"]["OPTIONS"]["transaction_mode"]
+        yield "untuned", {}, "DEFERRED"
+        for name, value in profile.items():
+            yield f"{name}={value}", {name: value}, "DEFERRED"
+        yield f"transaction_mode={profile_mode}", {}, profile_mode
+        yield "profile", profile, profile_mode
+
+    def handle(self, *args, **options):
+        reports = {}
+        for name, pragmas, transaction_mode in self.variants():
+            self.stderr.write(f"running {name}")
+            reports[name] = run_load_test(
+                nb_students=options["students"],
+                nb_questions=options["questions"],
+                pragmas=pragmas,
+                transaction_mode=transaction_mode,
+            )
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                json.dump(reports, output, indent=2)
+
+        self.stdout.write(
+            f"{'':28}{'req/s':>8}{'POST p99':>10}{'locked':>8}{'stats p50':>11}"
+        )
+        for name, report in reports.items():
+            self.stdout.write(
+                f"{name:28}"
+                f"{report['throughput']:>8.1f}"
+                f"{1000 * report['latency']['POST']['p99']:>8.0f}ms"
+                f"{report['lock_errors']:>8}"
+                f"{1000 * report['latency']['statistics']['p50']:>9.1f}ms"
+            )
@@ -0,0 +1,46 @@
+from datetime import datetime
+from urllib.parse import urljoin
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import get_fixed_timezone
+
+from quizz.models import QuizzSending
+from quizz.statistics import build_statistics_snapshot, generate_qrcode
+
+
+class Command(BaseCommand):
+    help = (
+        "Store the statistics of the closed quizz sendings that have none yet, "
+        "so that their statistics pages are served without computation."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "base_url",
+            help="URL of the site, for the QR codes, such as https://quiz.lecalamar.fr",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="compute again the statistics already stored",
+        )
+
+    def handle(self, *args, **options):
+        quizz_sendings = QuizzSending.objects.filter(
+            end_date__lt=datetime.now(tz=get_fixed_timezone(1))
+        ).select_related("quizz", "group")
+        if not options["all"]:
+            quizz_sendings = quizz_sendings.filter(statistics_snapshot__isnull=True)
+
+        def build_absolute_uri(location):
+            return urljoin(options["base_url"], location)
+
+        nb_snapshots = 0
+        for quizz_sending in quizz_sendings:
+            qrcode_url = generate_qrcode(quizz_sending.date_for_url, build_absolute_uri)
+            build_statistics_snapshot(quizz_sending, qrcode_url)
+            nb_snapshots += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"statistics of {nb_snapshots} sending(s) stored")
+        )
@@ -0,0 +1,39 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from quizz.loadtest import run_load_test
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate a whole group answering a quizz as soon as it starts, "
+        "on a temporary database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=30)
+        parser.add_argument("--questions", type=int, default=40)
+        parser.add_argument(
+            "--bulk",
+            action="store_true",
+            help="send all the answers in a single request",
+        )
+        parser.add_argument(
+            "--group-commit",
+            action="store_true",
+            help="insert the answers through the group commit writer",
+        )
+        parser.add_argument("--output", help="JSON file receiving the report")
+
+    def handle(self, *args, **options):
+        report = run_load_test(
+            nb_students=options["students"],
+            nb_questions=options["questions"],
+            bulk=options["bulk"],
+            group_commit=options["group_commit"],
+        )
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                json.dump(report, output, indent=2)
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from quizz.models import QuizzSending
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute from their answers the participation counters of all the quizz "
+        "sendings: participants, answers, points and date of the last answer."
+    )
+
+    def handle(self, *args, **options):
+        nb_reconciled = QuizzSending.objects.reconcile_counters()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"counters of {nb_reconciled} quizz sending(s) recomputed"
+            )
+        )
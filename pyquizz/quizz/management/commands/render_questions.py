@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from quizz.models import RENDER_VERSION, Question
+
+RENDERED_FIELDS = (
+    "rendered_statement",
+    "parsed_answers",
+    "rendered_answers",
+    "rendered_correct_answers",
+    "render_version",
+)
+
+
+class Command(BaseCommand):
+    help = "Store the HTML rendering of the questions rendered by an older version."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="render every question, even the up to date ones",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        questions = Question.objects.order_by("pk")
+        if not options["all"]:
+            questions = questions.exclude(render_version=RENDER_VERSION)
+
+        batch = []
+        nb_rendered = 0
+        for question in questions.iterator(chunk_size=options["batch_size"]):
+            question.render()
+            batch.append(question)
+            if len(batch) >= options["batch_size"]:
+                Question.objects.bulk_update(batch, RENDERED_FIELDS)
+                nb_rendered += len(batch)
+                batch = []
+        if batch:
+            Question.objects.bulk_update(batch, RENDERED_FIELDS)
+            nb_rendered += len(batch)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{nb_rendered} question(s) rendered (v{RENDER_VERSION})"
+            )
+        )
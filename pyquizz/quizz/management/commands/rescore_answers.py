@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from quizz.models import Question
+
+
+class Command(BaseCommand):
+    help = (
+        "Store again the points of the answers to the questions whose correct "
+        "answers or auto-evaluation changed, when saving them did not. "
+        "Interrupted runs can be restarted: a question stays to rescore until "
+        "all its answers are up to date."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="rescore the answers of every question",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        questions = Question.objects.order_by("pk")
+        if not options["all"]:
+            questions = questions.filter(needs_rescoring=True)
+
+        nb_questions = 0
+        nb_rescored = 0
+        for question in questions.only(
+            "correct_answers_mask", "auto_evaluation"
+        ).iterator():
+            nb_rescored += question.rescore_answers(options["batch_size"])
+            nb_questions += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{nb_rescored} answer(s) rescored for {nb_questions} question(s)"
+            )
+        )
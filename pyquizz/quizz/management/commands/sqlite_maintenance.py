@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+
+class Command(BaseCommand):
+    help = (
+        "Checkpoint the WAL, refresh the query planner statistics and "
+        "optionally give free pages back, without blocking the readers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--checkpoint",
+            choices=["PASSIVE", "FULL", "RESTART", "TRUNCATE"],
+            default="PASSIVE",
+            help="WAL checkpoint mode, PASSIVE never waits for the readers",
+        )
+        parser.add_argument(
+            "--vacuum-pages",
+            type=int,
+            default=0,
+            help="number of free pages to give back (auto_vacuum=INCREMENTAL)",
+        )
+
+    def run(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchall()
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("Only for SQLite databases.")
+
+        journal_mode = self.run("PRAGMA journal_mode")[0][0]
+        if journal_mode.lower() == "wal":
+            busy, wal_pages, checkpointed = self.run(
+                f"PRAGMA wal_checkpoint({options['checkpoint']})"
+            )[0]
+            self.stdout.write(
+                f"checkpoint: {checkpointed}/{wal_pages} WAL pages"
+                + (" (busy)" if busy else "")
+            )
+        else:
+            self.stdout.write(f"no checkpoint: journal_mode is {journal_mode}")
+
+        self.run("ANALYZE")
+        self.stdout.write("ANALYZE done")
+        self.run("PRAGMA optimize")
+        self.stdout.write("PRAGMA optimize done")
+
+        if options["vacuum_pages"]:
+            auto_vacuum = self.run("PRAGMA auto_vacuum")[0][0]
+            if auto_vacuum != 2:
+                self.stderr.write(
+                    "auto_vacuum is not INCREMENTAL: run once, site stopped, "
+                    "'PRAGMA auto_vacuum = INCREMENTAL; VACUUM;'"
+                )
+            else:
+                before = self.run("PRAGMA freelist_count")[0][0]
+                self.run(f"PRAGMA incremental_vacuum({options['vacuum_pages']})")
+                after = self.run("PRAGMA freelist_count")[0][0]
+                self.stdout.write(f"incremental vacuum: {before - after} pages freed")
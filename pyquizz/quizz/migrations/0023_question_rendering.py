@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quizz", "0022_alter_quizzsending_end_date"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="question",
+            name="parsed_answers",
+            field=models.JSONField(
+                blank=True,
+                default=list,
+                editable=False,
+                verbose_name="réponses possibles",
+            ),
+        ),
+        migrations.AddField(
+            model_name="question",
+            name="render_version",
+            field=models.PositiveSmallIntegerField(
+                default=0, editable=False, verbose_name="version du rendu"
+            ),
+        ),
+        migrations.AddField(
+            model_name="question",
+            name="rendered_answers",
+            field=models.JSONField(
+                blank=True,
+                default=list,
+                editable=False,
+                verbose_name="réponses possibles en HTML",
+            ),
+        ),
+        migrations.AddField(
+            model_name="question",
+            name="rendered_correct_answers",
+            field=models.JSONField(
+                blank=True,
+                default=list,
+                editable=False,
+                verbose_name="réponses correctes en HTML",
+            ),
+        ),
+        migrations.AddField(
+            model_name="question",
+            name="rendered_statement",
+            field=models.TextField(
+                blank=True, default="", editable=False, verbose_name="énoncé en HTML"
+            ),
+        ),
+    ]
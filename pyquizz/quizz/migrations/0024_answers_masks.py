@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:01
+
+from django.db import migrations, models
+
+
+def csv_to_mask(text):
+    mask = 0
+    for num in str(text).split(","):
+        if num.strip():
+            mask |= 1 << int(num)
+    return mask
+
+
+def fill_masks(apps, schema_editor):
+    # few distinct combinations of answers: one UPDATE per combination
+    for model_name, field_name in (
+        ("Answer", "answers"),
+        ("Question", "correct_answers"),
+    ):
+        model = apps.get_model("quizz", model_name)
+        values = model.objects.order_by().values_list(field_name, flat=True).distinct()
+        for value in list(values):
+            model.objects.filter(**{field_name: value}).update(
+                **{f"{field_name}_mask": csv_to_mask(value)}
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quizz", "0023_question_rendering"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="answer",
+            name="answers_mask",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="réponses choisies (masque)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="question",
+            name="correct_answers_mask",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="réponses correctes (masque)"
+            ),
+        ),
+        migrations.RunPython(fill_masks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:02
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_answers(apps, schema_editor):
+    # keep the first answer given, as the form used to refuse the next ones
+    Answer = apps.get_model("quizz", "Answer")
+    duplicates = (
+        Answer.objects.order_by()
+        .values("quizz_sending", "person", "question")
+        .annotate(first_pk=Min("pk"), nb_answers=Count("pk"))
+        .filter(nb_answers__gt=1)
+    )
+    for duplicate in duplicates:
+        Answer.objects.filter(
+            quizz_sending=duplicate["quizz_sending"],
+            person=duplicate["person"],
+            question=duplicate["question"],
+        ).exclude(pk=duplicate["first_pk"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quizz", "0024_answers_masks"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_answers, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="answer",
+            constraint=models.UniqueConstraint(
+                fields=("quizz_sending", "person", "question"),
+                name="unique_answer_per_question",
+            ),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:20
+
+from django.db import migrations, models
+
+
+def answer_points(answers_mask, correct_answers_mask, auto_evaluation):
+    if auto_evaluation:
+        highest_chosen = answers_mask.bit_length() - 1
+        return max(0, min(2, highest_chosen)) / 2
+    nb_errors = bin(answers_mask ^ correct_answers_mask).count("1")
+    return max(0, 1.0 - 0.5 * nb_errors)
+
+
+def fill_points(apps, schema_editor):
+    # few distinct answers per question: one UPDATE per (question, answers)
+    Answer = apps.get_model("quizz", "Answer")
+    Question = apps.get_model("quizz", "Question")
+    for question in Question.objects.only("correct_answers_mask", "auto_evaluation"):
+        answers = Answer.objects.filter(question=question).order_by()
+        masks = answers.values_list("answers_mask", flat=True).distinct()
+        for answers_mask in list(masks):
+            answers.filter(answers_mask=answers_mask).update(
+                points=answer_points(
+                    answers_mask,
+                    question.correct_answers_mask,
+                    question.auto_evaluation,
+                )
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quizz", "0025_unique_answer"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="answer",
+            name="points",
+            field=models.FloatField(
+                default=0.0,
+                editable=False,
+                help_text="points obtenus à la question, entre 0 et 1",
+                verbose_name="points",
+            ),
+        ),
+        migrations.AddField(
+            model_name="question",
+            name="needs_rescoring",
+            field=models.BooleanField(
+                default=False,
+                editable=False,
+                help_text="les points des réponses sont à recalculer (rescore_answers)",
+                verbose_name="réponses à recalculer",
+            ),
+        ),
+        migrations.RunPython(fill_points, migrations.RunPython.noop),
+    ]
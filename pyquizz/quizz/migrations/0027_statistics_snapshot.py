@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quizz", "0026_answer_points"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StatisticsSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "context",
+                    models.JSONField(
+                        help_text="statistiques calculées à la fin du quizz",
+                        verbose_name="statistiques",
+                    ),
+                ),
+                ("csv", models.TextField(blank=True, verbose_name="export CSV")),
+                (
+                    "qrcode",
+                    models.CharField(
+                        blank=True,
+                        help_text="URL de l'image du QR code",
+                        max_length=256,
+                        verbose_name="QR code",
+                    ),
+                ),
+                (
+                    "created",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="date de calcul"
+                    ),
+                ),
+                (
+                    "quizz_sending",
+                    models.OneToOneField(
+                        help_text="envoi de quizz terminé",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="statistics_snapshot",
+                        to="quizz.quizzsending",
+                        verbose_name="envoi de quizz",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Statistiques figées d'un envoi",
+                "verbose_name_plural": "Statistiques figées des envois",
+            },
+        ),
+    ]
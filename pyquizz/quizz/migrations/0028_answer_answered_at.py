@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quizz", "0027_statistics_snapshot"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="answer",
+            name="answered_at",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                help_text="date d'enregistrement de la réponse, vide pour les plus anciennes",
+                null=True,
+                verbose_name="date de réponse",
+            ),
+        ),
+    ]
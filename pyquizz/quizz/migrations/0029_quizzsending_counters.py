@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quizz", "0028_answer_answered_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="quizzsending",
+            name="last_answer_at",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                help_text="date d'enregistrement de la dernière réponse",
+                null=True,
+                verbose_name="date de la dernière réponse",
+            ),
+        ),
+        migrations.AddField(
+            model_name="quizzsending",
+            name="nb_answers",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="nombre de réponses aux questions du quizz",
+                verbose_name="nombre de réponses",
+            ),
+        ),
+        migrations.AddField(
+            model_name="quizzsending",
+            name="nb_participants",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="nombre de personnes ayant répondu au quizz",
+                verbose_name="nombre de participants",
+            ),
+        ),
+        migrations.AddField(
+            model_name="quizzsending",
+            name="total_points",
+            field=models.FloatField(
+                default=0.0,
+                editable=False,
+                help_text="somme des points de toutes les réponses",
+                verbose_name="total des points",
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quizz", "0029_quizzsending_counters"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="answer",
+            index=models.Index(fields=["answered_at"], name="answer_answered_at_idx"),
+        ),
+    ]
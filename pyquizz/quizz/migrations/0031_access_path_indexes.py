@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+# users are looked up by email without case (login, admin search), which
+# needs an index on the email folded the same way as the database does
+EMAIL_INDEX = {
+    "postgresql": "CREATE INDEX auth_user_email_idx ON auth_user (UPPER(email))",
+    "sqlite": "CREATE INDEX auth_user_email_idx ON auth_user (email COLLATE NOCASE)",
+}
+
+
+def create_email_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    schema_editor.execute(
+        EMAIL_INDEX.get(vendor, "CREATE INDEX auth_user_email_idx ON auth_user (email)")
+    )
+
+
+def drop_email_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "mysql":
+        schema_editor.execute("DROP INDEX auth_user_email_idx ON auth_user")
+    else:
+        schema_editor.execute("DROP INDEX auth_user_email_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quizz", "0030_answer_answered_at_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="answer",
+            index=models.Index(
+                fields=["person", "quizz_sending"], name="answer_person_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="quizzsending",
+            index=models.Index(fields=["group", "date"], name="sending_group_date_idx"),
+        ),
+        migrations.RunPython(create_email_index, drop_email_index),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quizz", "0031_access_path_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="reviewanswer",
+            index=models.Index(
+                fields=["review", "email"], name="reviewanswer_review_idx"
+            ),
+        ),
+    ]
@@ -1,10 +1,25 @@
 import re
+from collections import Counter, defaultdict
 from datetime import datetime
 
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import (
+    Case,
+    Count,
+    Exists,
+    F,
+    FloatField,
+    Max,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, Greatest
 from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.dispatch import Signal, receiver
 from django.urls import reverse
 from django.utils.functional import cached_property
 from django.utils.safestring import mark_safe
@@ -19,6 +34,210 @@ def md2html(text):
     return mark_safe(text)
 
 
+# bump when md2html or the answers parsing change, to re-render stored questions
+RENDER_VERSION = 1
+
+
+def split_indexes(text):
+    """Indexes from a comma separated list of numbers, such as "0,2"."""
+    return [int(num) for num in str(text).split(",") if num.strip()]
+
+
+# answers are stored as bitmasks, bit i set when answer i is chosen or correct
+ANSWERS_MASK_BITS = 16
+
+
+def indexes_to_mask(indexes):
+    mask = 0
+    for index in indexes:
+        mask |= 1 << index
+    return mask
+
+
+def mask_to_indexes(mask):
+    return [index for index in range(mask.bit_length()) if mask >> index & 1]
+
+
+def answer_points(answers_mask, correct_answers_mask, auto_evaluation):
+    """Points of the answers in answers_mask, between 0 and 1."""
+    if auto_evaluation:
+        # consider that the user knows at least the subject
+        highest_chosen = answers_mask.bit_length() - 1
+        return max(0, min(2, highest_chosen)) / 2
+    nb_errors = bin(answers_mask ^ correct_answers_mask).count("1")
+    return max(0, 1.0 - 0.5 * nb_errors)
+
+
+def popcount(expression):
+    """SQL expression counting the bits set in an answers mask expression."""
+    bits = expression.bitand(1)
+    for index in range(1, ANSWERS_MASK_BITS):
+        bits = bits + expression.bitrightshift(index).bitand(1)
+    return bits
+
+
+def auto_evaluation_points():
+    """SQL version of Question.nb_points for an auto-evaluation question."""
+    return Case(
+        When(answers_mask__gte=1 << 2, then=Value(1.0)),
+        When(answers_mask__gte=1 << 1, then=Value(0.5)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def multiple_choice_points(correct_answers_mask):
+    """SQL version of Question.nb_points for a multiple choice question."""
+    chosen = F("answers_mask")
+    # no XOR operator in SQLite: a ^ b == (a | b) - (a & b)
+    errors = popcount(
+        chosen.bitor(correct_answers_mask) - chosen.bitand(correct_answers_mask)
+    )
+    return Greatest(
+        Value(0.0), Value(1.0) - errors * Value(0.5), output_field=FloatField()
+    )
+
+
+# sent once answers inserted by AnswerQuerySet.record() are committed
+answers_recorded = Signal()
+
+# sent once the points of the answers to a question changed
+answers_rescored = Signal()
+
+
+class AnswerQuerySet(models.QuerySet):
+    def record(self, answers):
+        """Insert answers in one transaction, return the ones actually inserted.
+
+        Answers to an already answered question are skipped, any other
+        integrity error is raised.
+        """
+        now = datetime.now(tz=get_default_timezone())
+        for answer in answers:
+            if answer.answered_at is None:
+                answer.answered_at = now
+        with transaction.atomic():
+            inserted = self._insert_answers(answers)
+            if inserted:
+                QuizzSending.objects.count_answers(inserted)
+        if inserted:
+            transaction.on_commit(
+                lambda: answers_recorded.send(sender=self.model, answers=inserted)
+            )
+        return inserted
+
+    def _insert_answers(self, answers):
+        try:
+            with transaction.atomic():
+                return self.bulk_create(answers)
+        except IntegrityError:
+            answered = self._answered_questions(answers)
+            remaining = [
+                answer
+                for answer in answers
+                if (answer.quizz_sending_id, answer.person_id, answer.question_id)
+                not in answered
+            ]
+            if len(remaining) == len(answers):
+                raise  # not a question already answered, e.g. a deleted question
+        # some questions were already answered: insert the others
+        return self._insert_answers(remaining) if remaining else []
+
+    def _answered_questions(self, answers):
+        """(quizz_sending, person, question) of the answers already in database."""
+        return set(
+            self.filter(
+                quizz_sending__in={answer.quizz_sending_id for answer in answers},
+                person__in={answer.person_id for answer in answers},
+                question__in={answer.question_id for answer in answers},
+            ).values_list("quizz_sending", "person", "question")
+        )
+
+
+class QuizzQuerySet(models.QuerySet):
+    def with_nb_questions(self):
+        """Annotate nb_questions, with a subquery so that filters do not change it."""
+        questions = (
+            Quizz.questions.through.objects.filter(quizz=OuterRef("pk"))
+            .order_by()
+            .values("quizz")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        return self.annotate(nb_questions=Coalesce(Subquery(questions), 0))
+
+
+class QuizzSendingQuerySet(models.QuerySet):
+    def count_answers(self, answers):
+        """Add just inserted answers to the counters of their sendings.
+
+        Must run in the transaction which inserted them.
+        """
+        answers_per_sending = defaultdict(list)
+        for answer in answers:
+            answers_per_sending[answer.quizz_sending_id].append(answer)
+        # concurrent inserts in the same sending wait here, so that each of
+        # them sees the answers of the others when counting the participants.
+        # SQLite has no row lock, its write lock, taken by the insert,
+        # already makes them wait
+        list(
+            self.select_for_update()
+            .filter(pk__in=answers_per_sending)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        inserted_per_person = Counter(
+            (answer.quizz_sending_id, answer.person_id) for answer in answers
+        )
+        answers_per_person = (
+            Answer.objects.filter(
+                quizz_sending__in=answers_per_sending,
+                person__in={person for _, person in inserted_per_person},
+            )
+            .order_by()
+            .values_list("quizz_sending", "person")
+            .annotate(nb_answers=Count("pk"))
+        )
+        new_participants = Counter(
+            quizz_sending
+            for quizz_sending, person, nb_answers in answers_per_person
+            if nb_answers == inserted_per_person[quizz_sending, person]
+        )
+
+        for quizz_sending, sending_answers in answers_per_sending.items():
+            last_answer_at = Value(
+                max(answer.answered_at for answer in sending_answers),
+                output_field=models.DateTimeField(),
+            )
+            self.filter(pk=quizz_sending).update(
+                nb_participants=F("nb_participants") + new_participants[quizz_sending],
+                nb_answers=F("nb_answers") + len(sending_answers),
+                total_points=F("total_points")
+                + sum(answer.points for answer in sending_answers),
+                last_answer_at=Greatest(
+                    Coalesce("last_answer_at", last_answer_at), last_answer_at
+                ),
+            )
+
+    def reconcile_counters(self):
+        """Recompute the counters of the sendings from their answers."""
+        answers = (
+            Answer.objects.filter(quizz_sending=OuterRef("pk"))
+            .order_by()
+            .values("quizz_sending")
+        )
+
+        def aggregate(expression):
+            return Subquery(answers.annotate(value=expression).values("value"))
+
+        return self.update(
+            nb_participants=Coalesce(aggregate(Count("person", distinct=True)), 0),
+            nb_answers=Coalesce(aggregate(Count("pk")), 0),
+            total_points=Coalesce(aggregate(Sum("points")), 0.0),
+            last_answer_at=aggregate(Max("answered_at")),
+        )
+
+
 class Group(models.Model):
     class Meta:
         ordering = ["name"]
@@ -95,58 +314,181 @@ class Question(models.Model):
         verbose_name="question d'auto-évaluation",
         help_text="est-ce une question d'auto-évaluation",
     )
+    correct_answers_mask = models.PositiveIntegerField(
+        null=False,
+        blank=False,
+        editable=False,
+        default=0,
+        verbose_name="réponses correctes (masque)",
+    )
+    rendered_statement = models.TextField(
+        null=False,
+        blank=True,
+        editable=False,
+        default="",
+        verbose_name="énoncé en HTML",
+    )
+    parsed_answers = models.JSONField(
+        null=False,
+        blank=True,
+        editable=False,
+        default=list,
+        verbose_name="réponses possibles",
+    )
+    rendered_answers = models.JSONField(
+        null=False,
+        blank=True,
+        editable=False,
+        default=list,
+        verbose_name="réponses possibles en HTML",
+    )
+    rendered_correct_answers = models.JSONField(
+        null=False,
+        blank=True,
+        editable=False,
+        default=list,
+        verbose_name="réponses correctes en HTML",
+    )
+    render_version = models.PositiveSmallIntegerField(
+        null=False,
+        blank=False,
+        editable=False,
+        default=0,
+        verbose_name="version du rendu",
+    )
+    needs_rescoring = models.BooleanField(
+        null=False,
+        blank=False,
+        editable=False,
+        default=False,
+        verbose_name="réponses à recalculer",
+        help_text="les points des réponses sont à recalculer (rescore_answers)",
+    )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        question = super().from_db(db, field_names, values)
+        # remember how the stored answers were scored, see save()
+        loaded = question.__dict__
+        if "correct_answers" in loaded and "auto_evaluation" in loaded:
+            question._loaded_scoring = (
+                loaded["correct_answers"],
+                loaded["auto_evaluation"],
+            )
+        return question
 
     def get_absolute_url(self):
         return reverse("quizz_question_detail", args=[str(self.slug)])
 
+    @property
+    def is_rendered(self) -> bool:
+        return self.render_version == RENDER_VERSION
+
+    def render(self):
+        """Parse the answers and store the HTML of the question on the instance."""
+        answers = [answer.strip() for answer in str(self.answers).split("----")]
+        if not self.auto_evaluation:
+            answers.append("Je sais que je ne sais pas, et j'ai le courage de l'avouer")
+        self.parsed_answers = answers
+        self.rendered_statement = md2html(self.statement)
+        self.rendered_answers = [md2html(a) for a in answers]
+        self.rendered_correct_answers = [
+            self.rendered_answers[i]
+            for i in split_indexes(self.correct_answers)
+            if i < len(answers)
+        ]
+        self.render_version = RENDER_VERSION
+
+    def save(self, *args, **kwargs):
+        self.correct_answers_mask = indexes_to_mask(split_indexes(self.correct_answers))
+        self.render()
+        loaded_scoring = getattr(self, "_loaded_scoring", None)
+        if loaded_scoring and loaded_scoring != (
+            self.correct_answers,
+            self.auto_evaluation,
+        ):
+            self.needs_rescoring = True
+        super().save(*args, **kwargs)
+        self._loaded_scoring = (self.correct_answers, self.auto_evaluation)
+        if self.needs_rescoring:
+            transaction.on_commit(self.rescore_answers)
+
+    def rescore_answers(self, batch_size=1000):
+        """Store again the points of the answers, one transaction per batch.
+
+        Return the number of answers whose points changed.
+        """
+        points = self.points_expression()
+        answers = Answer.objects.filter(question=self).order_by("pk")
+        nb_rescored = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                answers.filter(pk__gt=last_pk).values_list("pk", flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            with transaction.atomic():
+                nb_rescored += (
+                    answers.filter(pk__gte=batch[0], pk__lte=batch[-1])
+                    .exclude(points=points)
+                    .update(points=points)
+                )
+            last_pk = batch[-1]
+        if nb_rescored:
+            QuizzSending.objects.filter(quizz__questions=self).reconcile_counters()
+            answers_rescored.send(sender=Question, question=self)
+        # unless the question changed again in the meantime
+        Question.objects.filter(
+            pk=self.pk,
+            correct_answers_mask=self.correct_answers_mask,
+            auto_evaluation=self.auto_evaluation,
+        ).update(needs_rescoring=False)
+        return nb_rescored
+
     @cached_property
     def nb_good_answers(self) -> int:
         return len(self.correct_answers.split(","))
 
     @cached_property
     def statement_html(self):
-        return md2html(self.statement)
+        if not self.is_rendered:
+            self.render()
+        return mark_safe(self.rendered_statement)
 
     @cached_property
     def possible_answers(self):
-        answers = [answer.strip() for answer in str(self.answers).split("----")]
-        if not self.auto_evaluation:
-            answers.append("Je sais que je ne sais pas, et j'ai le courage de l'avouer")
-        return answers
+        if not self.is_rendered:
+            self.render()
+        return self.parsed_answers
 
     @cached_property
     def possible_answers_html(self):
-        return [md2html(a) for a in self.possible_answers]
+        if not self.is_rendered:
+            self.render()
+        return [mark_safe(a) for a in self.rendered_answers]
 
     @cached_property
     def correct_answers_text(self):
-        correct_answers = [int(num) for num in str(self.correct_answers).split(",")]
         possible_answers = self.possible_answers
-        return [possible_answers[i] for i in correct_answers]
+        return [possible_answers[i] for i in split_indexes(self.correct_answers)]
 
     @cached_property
     def correct_answers_html(self):
-        return [md2html(a) for a in self.correct_answers_text]
+        if not self.is_rendered:
+            self.render()
+        return [mark_safe(a) for a in self.rendered_correct_answers]
 
     def nb_points(self, answer):
+        return answer_points(
+            answer.answers_mask, self.correct_answers_mask, self.auto_evaluation
+        )
+
+    def points_expression(self):
+        """SQL expression of the points of an answer to this question."""
         if self.auto_evaluation:
-            ret = 0
-            for chosen in answer.chosen_answers:
-                if chosen:
-                    ret = min(2, max(int(chosen), ret))
-            # consider that the user knows at least the subject
-            return ret / 2
-        else:
-            points = 1.0
-            correct_answers = self.correct_answers.split(",")
-            answers = answer.answers.split(",")
-            for answer in correct_answers:
-                if answer not in answers:
-                    points -= 0.5
-            for answer in answers:
-                if answer not in correct_answers:
-                    points -= 0.5
-            return max(0, points)
+            return auto_evaluation_points()
+        return multiple_choice_points(Value(self.correct_answers_mask))
 
     def __str__(self):
         return self.statement
@@ -183,6 +525,8 @@ class Quizz(models.Model):
         help_text="est-ce que les questions seront posées en ordre aléatoire",
     )
 
+    objects = QuizzQuerySet.as_manager()
+
     def get_absolute_url(self):
         return reverse("quizz_quizz_detail", args=[str(self.slug)])
 
@@ -199,6 +543,9 @@ class QuizzSending(models.Model):
         ordering = ["-date"]
         verbose_name = "Envoi de quizz"
         verbose_name_plural = "Envois de quizz"
+        indexes = [
+            models.Index(fields=["group", "date"], name="sending_group_date_idx"),
+        ]
 
     quizz = models.ForeignKey(
         Quizz,
@@ -239,6 +586,40 @@ class QuizzSending(models.Model):
         verbose_name="quiz démarré",
         help_text="est-ce que ce quiz est démarré",
     )
+    # counters maintained by AnswerQuerySet.record(), see reconcile_counters
+    nb_participants = models.PositiveIntegerField(
+        null=False,
+        blank=False,
+        default=0,
+        editable=False,
+        verbose_name="nombre de participants",
+        help_text="nombre de personnes ayant répondu au quizz",
+    )
+    nb_answers = models.PositiveIntegerField(
+        null=False,
+        blank=False,
+        default=0,
+        editable=False,
+        verbose_name="nombre de réponses",
+        help_text="nombre de réponses aux questions du quizz",
+    )
+    total_points = models.FloatField(
+        null=False,
+        blank=False,
+        default=0.0,
+        editable=False,
+        verbose_name="total des points",
+        help_text="somme des points de toutes les réponses",
+    )
+    last_answer_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="date de la dernière réponse",
+        help_text="date d'enregistrement de la dernière réponse",
+    )
+
+    objects = QuizzSendingQuerySet.as_manager()
 
     def get_absolute_url(self):
         return reverse("form", args=[self.date_for_url])
@@ -253,11 +634,14 @@ class QuizzSending(models.Model):
 
     @property
     def nb_persons(self):
-        self.answers.all()
-        emails = set()
-        for p in self.answers.all():
-            emails.add(p.person.email)
-        return max(1, len(emails))  # avoid division by 0
+        return max(1, self.nb_participants)  # avoid division by 0
+
+    def unanswered_questions(self, person):
+        """Questions of the quizz not answered yet by person, as an anti-join."""
+        answers = Answer.objects.filter(
+            quizz_sending=self, person=person, question=OuterRef("pk")
+        )
+        return self.quizz.questions.filter(~Exists(answers))
 
     def __hash__(self):
         return hash(("QuizzSending", self.date_for_url))
@@ -271,6 +655,18 @@ class Answer(models.Model):
         ordering = ["quizz_sending", "person", "question"]
         verbose_name = "Réponse à une question"
         verbose_name_plural = "Réponses à des questions"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["quizz_sending", "person", "question"],
+                name="unique_answer_per_question",
+            )
+        ]
+        indexes = [
+            # answers of a student, per sending
+            models.Index(fields=["person", "quizz_sending"], name="answer_person_idx"),
+            # date hierarchy of the admin
+            models.Index(fields=["answered_at"], name="answer_answered_at_idx"),
+        ]
 
     quizz_sending = models.ForeignKey(
         QuizzSending,
@@ -310,10 +706,58 @@ class Answer(models.Model):
         ),
         max_length=20,
     )
+    answers_mask = models.PositiveIntegerField(
+        null=False,
+        blank=False,
+        editable=False,
+        default=0,
+        verbose_name="réponses choisies (masque)",
+    )
+    points = models.FloatField(
+        null=False,
+        blank=False,
+        editable=False,
+        default=0.0,
+        verbose_name="points",
+        help_text="points obtenus à la question, entre 0 et 1",
+    )
+    answered_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="date de réponse",
+        help_text="date d'enregistrement de la réponse, vide pour les plus anciennes",
+    )
+
+    objects = AnswerQuerySet.as_manager()
+
+    @classmethod
+    def from_indexes(cls, indexes, question, **kwargs):
+        """Answer to question choosing the possible answers at these indexes.
+
+        question is a Question or a snapshot of it.
+        """
+        answers_mask = indexes_to_mask(indexes)
+        return cls(
+            answers=",".join(str(index) for index in sorted(indexes)),
+            answers_mask=answers_mask,
+            question_id=question.pk,
+            points=answer_points(
+                answers_mask, question.correct_answers_mask, question.auto_evaluation
+            ),
+            **kwargs,
+        )
 
     def get_absolute_url(self):
         return reverse("quizz_answer_detail", args=[str(self.pk)])
 
+    def save(self, *args, **kwargs):
+        self.answers_mask = indexes_to_mask(split_indexes(self.answers))
+        self.points = self.question.nb_points(self)
+        if self._state.adding and self.answered_at is None:
+            self.answered_at = datetime.now(tz=get_default_timezone())
+        super().save(*args, **kwargs)
+
     @cached_property
     def chosen_answers(self):
         if self.answers:
@@ -327,12 +771,12 @@ class Answer(models.Model):
 
     @cached_property
     def chosen_answers_html(self):
-        possible_answers = self.question.possible_answers
-        return [md2html(possible_answers[int(index)]) for index in self.chosen_answers]
+        possible_answers = self.question.possible_answers_html
+        return [possible_answers[int(index)] for index in self.chosen_answers]
 
-    @cached_property
+    @property
     def nb_points(self):
-        return self.question.nb_points(self)
+        return self.points
 
     def __str__(self):
         return (
@@ -341,11 +785,56 @@ class Answer(models.Model):
         )
 
 
+class StatisticsSnapshot(models.Model):
+    class Meta:
+        verbose_name = "Statistiques figées d'un envoi"
+        verbose_name_plural = "Statistiques figées des envois"
+
+    quizz_sending = models.OneToOneField(
+        QuizzSending,
+        on_delete=models.CASCADE,
+        related_name="statistics_snapshot",
+        blank=False,
+        null=False,
+        verbose_name="envoi de quizz",
+        help_text="envoi de quizz terminé",
+    )
+    context = models.JSONField(
+        null=False,
+        blank=False,
+        verbose_name="statistiques",
+        help_text="statistiques calculées à la fin du quizz",
+    )
+    csv = models.TextField(
+        null=False,
+        blank=True,
+        verbose_name="export CSV",
+    )
+    qrcode = models.CharField(
+        null=False,
+        blank=True,
+        verbose_name="QR code",
+        help_text="URL de l'image du QR code",
+        max_length=256,
+    )
+    created = models.DateTimeField(
+        null=False,
+        auto_now_add=True,
+        verbose_name="date de calcul",
+    )
+
+    def __str__(self):
+        return f"statistiques de l'{self.quizz_sending}"
+
+
 class ReviewAnswer(models.Model):
     class Meta:
         ordering = ["review", "email", "pk"]
         verbose_name = "Réponse à un bilan"
         verbose_name_plural = "Réponses à un bilan"
+        indexes = [
+            models.Index(fields=["review", "email"], name="reviewanswer_review_idx"),
+        ]
 
     review = models.CharField(
         null=False,
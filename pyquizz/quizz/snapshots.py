@@ -0,0 +1,185 @@
+"""Snapshot of a started quizz sending, shared by the processes in the cache.
+
+During a session, the questions of the quizz and the group members do not
+change: they are read once when the sending starts, and each student gets
+the questions in an order drawn from a deterministic seed.
+"""
+
+import random
+from collections import namedtuple
+from datetime import datetime
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils.timezone import get_default_timezone
+
+from .models import Group, Question, Quizz, QuizzSending
+
+SnapshotQuestion = namedtuple(
+    "SnapshotQuestion",
+    [
+        "pk",
+        "statement_html",
+        "possible_answers_html",
+        "nb_good_answers",
+        "correct_answers_mask",
+        "auto_evaluation",
+    ],
+)
+
+# the snapshot of a sending with a far end date is refreshed once a day
+MAX_TIMEOUT = 24 * 60 * 60
+
+
+def snapshot_key(date_for_url):
+    return f"quizz_snapshot:{date_for_url}"
+
+
+class SendingSnapshot:
+    def __init__(self, quizz_sending, questions, roster):
+        self.quizz_sending = quizz_sending
+        self.questions = {question.pk: question for question in questions}
+        self.roster = frozenset(roster)
+
+    @property
+    def timeout(self):
+        now = datetime.now(tz=get_default_timezone())
+        remaining = (self.quizz_sending.end_date - now).total_seconds()
+        return max(1, min(MAX_TIMEOUT, int(remaining)))
+
+    def question_order(self, person_id):
+        order = sorted(self.questions)
+        if self.quizz_sending.quizz.random_question_order:
+            seed = f"{self.quizz_sending.date_for_url}:{person_id}"
+            random.Random(seed).shuffle(order)
+        return order
+
+    def next_question(self, person_id, answered_question_ids):
+        """Return the next question to ask and the number of questions left."""
+        unanswered = [
+            pk
+            for pk in self.question_order(person_id)
+            if pk not in answered_question_ids
+        ]
+        if not unanswered:
+            return None, 0
+        return self.questions[unanswered[0]], len(unanswered)
+
+
+def make_snapshot(quizz_sending):
+    """Snapshot of the sending, not stored in the cache."""
+    questions = [
+        SnapshotQuestion(
+            pk=question.pk,
+            statement_html=question.statement_html,
+            possible_answers_html=question.possible_answers_html,
+            nb_good_answers=question.nb_good_answers,
+            correct_answers_mask=question.correct_answers_mask,
+            auto_evaluation=question.auto_evaluation,
+        )
+        for question in quizz_sending.quizz.questions.all()
+    ]
+    roster = quizz_sending.group.persons.values_list("pk", flat=True)
+    return SendingSnapshot(quizz_sending, questions, roster)
+
+
+def build_snapshot(quizz_sending):
+    snapshot = make_snapshot(quizz_sending)
+    cache.set(
+        snapshot_key(quizz_sending.date_for_url), snapshot, timeout=snapshot.timeout
+    )
+    return snapshot
+
+
+def get_snapshot(date_for_url):
+    """Snapshot of the running sending at this date, None if not in the cache."""
+    return cache.get(snapshot_key(date_for_url))
+
+
+def drop_snapshots(quizz_sendings):
+    cache.delete_many(
+        [snapshot_key(quizz_sending.date_for_url) for quizz_sending in quizz_sendings]
+    )
+
+
+def drop_snapshots_on_commit(quizz_sendings):
+    """Drop the snapshots once the transaction is committed.
+
+    Dropped before, a request could cache the former questions again until
+    the commit, for up to MAX_TIMEOUT. A queryset is evaluated at the commit.
+    """
+    transaction.on_commit(lambda: drop_snapshots(quizz_sendings))
+
+
+def is_running(quizz_sending):
+    now = datetime.now(tz=get_default_timezone())
+    return quizz_sending.started and now < quizz_sending.end_date
+
+
+def started_sendings(**filters):
+    return QuizzSending.objects.filter(started=True, **filters).only("date")
+
+
+def refresh_snapshot(quizz_sending_pk, date_for_url):
+    cache.delete(snapshot_key(date_for_url))
+    quizz_sending = (
+        QuizzSending.objects.select_related("quizz", "group")
+        .filter(pk=quizz_sending_pk)
+        .first()
+    )
+    if quizz_sending is not None and is_running(quizz_sending):
+        build_snapshot(quizz_sending)
+
+
+@receiver(post_save, sender=QuizzSending)
+def refresh_sending_snapshot(sender, instance, **kwargs):
+    transaction.on_commit(partial(refresh_snapshot, instance.pk, instance.date_for_url))
+
+
+@receiver(post_delete, sender=QuizzSending)
+def drop_deleted_sending_snapshot(sender, instance, **kwargs):
+    drop_snapshots_on_commit([instance])
+
+
+@receiver(post_save, sender=Quizz)
+def drop_quizz_sendings_snapshots(sender, instance, **kwargs):
+    # such as random_question_order
+    drop_snapshots_on_commit(started_sendings(quizz=instance))
+
+
+@receiver(post_save, sender=Question)
+def drop_question_snapshots(sender, instance, **kwargs):
+    drop_snapshots_on_commit(started_sendings(quizz__questions=instance))
+
+
+@receiver(pre_delete, sender=Question)
+def drop_deleted_question_snapshots(sender, instance, **kwargs):
+    # the quizzes of the question are forgotten once it is deleted
+    drop_snapshots_on_commit(list(started_sendings(quizz__questions=instance)))
+
+
+@receiver(m2m_changed, sender=Quizz.questions.through)
+def drop_quizz_snapshots(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        drop_snapshots_on_commit(started_sendings(quizz=instance))
+    elif pk_set:  # question.quizzes changed
+        drop_snapshots_on_commit(started_sendings(quizz__in=pk_set))
+    else:
+        drop_snapshots_on_commit(started_sendings())
+
+
+@receiver(m2m_changed, sender=Group.persons.through)
+def drop_group_snapshots(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        drop_snapshots_on_commit(started_sendings(group=instance))
+    elif pk_set:  # user.pyquizz_groups changed
+        drop_snapshots_on_commit(started_sendings(group__in=pk_set))
+    else:
+        drop_snapshots_on_commit(started_sendings())
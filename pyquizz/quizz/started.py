@@ -0,0 +1,41 @@
+"""Tell the students waiting for a quizz sending whether it started.
+
+Waiting pages poll every QUIZZ_START_POLL_INTERVAL seconds. The answer
+comes from a flag kept in the cache, set whenever a sending is saved, so
+a class waiting for the start costs cache reads, without any query, and
+no worker stays busy waiting. A started flag is always checked again in
+the database, since a sending can be stopped again.
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import QuizzSending
+
+STARTED_TIMEOUT = 60 * 60
+
+
+def started_key(date_for_url):
+    return f"quizz_started:{date_for_url}"
+
+
+def is_started(date, date_for_url):
+    """Whether the sending at this date is started, None if there is none."""
+    key = started_key(date_for_url)
+    if cache.get(key) is False:
+        return False
+    started = (
+        QuizzSending.objects.filter(date=date).values_list("started", flat=True).first()
+    )
+    if started is not None:
+        cache.set(key, started, STARTED_TIMEOUT)
+    return started
+
+
+@receiver(post_save, sender=QuizzSending)
+def cache_started_flag(sender, instance, **kwargs):
+    key, started = started_key(instance.date_for_url), instance.started
+    # not before the commit: a rolled back stop would keep the students waiting
+    transaction.on_commit(lambda: cache.set(key, started, STARTED_TIMEOUT))
@@ -0,0 +1,740 @@
+"""Statistics of the answers to a quizz sending."""
+
+import threading
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime
+from functools import partial
+from itertools import groupby
+from operator import itemgetter
+
+import qrcode
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import FilteredRelation, Q
+from django.db.models.functions import Upper
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.formats import number_format
+from django.utils.safestring import mark_safe
+from django.utils.timezone import get_fixed_timezone, localtime
+
+from .models import (
+    Answer,
+    Group,
+    Question,
+    Quizz,
+    QuizzSending,
+    StatisticsSnapshot,
+    answers_recorded,
+    answers_rescored,
+    mask_to_indexes,
+    split_indexes,
+)
+
+# the names are refreshed at least once a day
+NAMES_TIMEOUT = 24 * 60 * 60
+
+# as well as the statistics of a student
+STUDENT_TIMEOUT = 24 * 60 * 60
+
+
+class Progress:
+    def __init__(self, value, max_value):
+        self.value = value
+        self.max_value = max_value
+
+    @property
+    def percentage(self):
+        return int(100 * self.value / self.max_value)
+
+    @property
+    def note(self):
+        return self.percentage / 5
+
+    @property
+    def reverse_percentage(self):
+        return 100 - self.percentage
+
+
+class Statistics:
+    def __init__(self, text, value, max_value, extra_text=""):
+        self.text = text
+        self.extra_text = extra_text
+        self.progress = Progress(value, max_value)
+
+    def as_list(self):
+        progress = self.progress
+        return [self.text, progress.value, progress.max_value, self.extra_text]
+
+    @classmethod
+    def from_list(cls, values, html=False):
+        """Statistics saved by as_list(), html when the texts are trusted HTML."""
+        text, value, max_value, extra_text = values
+        if html:
+            text, extra_text = mark_safe(text), mark_safe(extra_text)
+        return cls(text, value, max_value, extra_text)
+
+
+class SendingAggregate:
+    """Counters of the answers to a quizz sending, filled in a single pass."""
+
+    def __init__(self, with_picks=True):
+        self.with_picks = with_picks
+        self.nb_answers = 0
+        self.answers_per_person = Counter()
+        self.points_per_person = Counter()
+        self.answers_per_question = Counter()
+        self.points_per_question = Counter()
+        self.picks = defaultdict(Counter)  # question -> answer index -> count
+
+    def add(self, person_id, question_id, answers_mask, nb_points):
+        self.nb_answers += 1
+        self.answers_per_person[person_id] += 1
+        self.points_per_person[person_id] += nb_points
+        self.answers_per_question[question_id] += 1
+        self.points_per_question[question_id] += nb_points
+        if self.with_picks:
+            picks = self.picks[question_id]
+            for index in mask_to_indexes(answers_mask):
+                picks[index] += 1
+
+    @classmethod
+    def from_database(cls, quizz_sending, with_picks=True):
+        aggregate = cls(with_picks=with_picks)
+        answers = (
+            Answer.objects.filter(quizz_sending=quizz_sending)
+            .order_by()
+            .values_list("person_id", "question_id", "answers_mask", "points")
+        )
+        for answer in answers.iterator():
+            aggregate.add(*answer)
+        return aggregate
+
+    @property
+    def nb_persons(self):
+        return max(1, len(self.answers_per_person))  # avoid division by 0
+
+    def persons_answered_questions(self, names, nb_questions):
+        """Progress of each person, names is {person pk: name}."""
+        statistics = [
+            Statistics(
+                text=name,
+                value=self.answers_per_person[pk],
+                max_value=nb_questions,
+            )
+            for pk, name in names.items()
+        ]
+        statistics.sort(key=lambda p: (p.progress.value, p.text))
+        return statistics
+
+    def persons_correct_questions(self, names, nb_questions):
+        """Grade of each person, names is {person pk: name}."""
+        statistics = [
+            Statistics(
+                text=name,
+                value=self.points_per_person[pk],
+                max_value=nb_questions,
+            )
+            for pk, name in names.items()
+        ]
+        statistics.sort(key=lambda p: p.text)
+        return statistics
+
+    def questions(self, questions):
+        return [
+            Statistics(
+                text=question.statement_html,
+                value=self.points_per_question[question.pk],
+                max_value=self.nb_persons,
+                extra_text="\n".join(question.possible_answers_html),
+            )
+            for question in questions
+        ]
+
+    def questions_answers_stats(self, questions):
+        """Statistics of each possible answer, by question statement."""
+        stats = {}
+        for question in questions:
+            picks = self.picks[question.pk]
+            stats[question.statement_html] = [
+                Statistics(
+                    text=possible_answer,
+                    value=picks[index],
+                    max_value=self.answers_per_question[question.pk],
+                )
+                for index, possible_answer in enumerate(question.possible_answers_html)
+            ]
+        return stats
+
+
+# backends whose incr() cannot lose a concurrent increment, LocMemCache only
+# within its process
+ATOMIC_INCR_CACHES = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.memcached.PyLibMCCache",
+    "django.core.cache.backends.memcached.PyMemcacheCache",
+    "django.core.cache.backends.redis.RedisCache",
+}
+
+
+class LiveCounters:
+    """Counters of the answers to a sending, kept in the cache while it runs.
+
+    The counters are incremented when answers are recorded, so that the
+    statistics page of a running sending does not read all the answers at
+    each refresh. They belong to the generation named by the marker key:
+    without marker, they are computed again from the database in a new
+    generation. The marker expires after QUIZZ_LIVE_COUNTERS_TIMEOUT, which
+    bounds the effect of a lost increment. Points are counted in half
+    points, to stay integers.
+
+    Concurrent increments are only counted by the backends of
+    ATOMIC_INCR_CACHES, the others, such as the file cache, read and write
+    the value: with them, recorded answers drop the marker instead.
+    """
+
+    def __init__(self, quizz_sending_pk):
+        self.prefix = f"quizz_live:{quizz_sending_pk}"
+        self.quizz_sending_pk = quizz_sending_pk
+
+    @property
+    def timeout(self):
+        return getattr(settings, "QUIZZ_LIVE_COUNTERS_TIMEOUT", 5 * 60)
+
+    @property
+    def marker_key(self):
+        return f"{self.prefix}:generation"
+
+    def key(self, generation, *parts):
+        return ":".join([self.prefix, generation, *(str(part) for part in parts)])
+
+    def counters(self, generation, aggregate):
+        """Cache keys and values of the counters of an aggregate."""
+        key = partial(self.key, generation)
+        counters = {key("answers"): aggregate.nb_answers}
+        for pk, nb_answers in aggregate.answers_per_person.items():
+            counters[key("person", pk, "answers")] = nb_answers
+            counters[key("person", pk, "points")] = round(
+                2 * aggregate.points_per_person[pk]
+            )
+        for pk, nb_answers in aggregate.answers_per_question.items():
+            counters[key("question", pk, "answers")] = nb_answers
+            counters[key("question", pk, "points")] = round(
+                2 * aggregate.points_per_question[pk]
+            )
+            for index, nb_picks in aggregate.picks[pk].items():
+                counters[key("question", pk, "picks", index)] = nb_picks
+        return counters
+
+    def add(self, answers):
+        """Count answers newly recorded for this sending."""
+        if settings.CACHES["default"]["BACKEND"] not in ATOMIC_INCR_CACHES:
+            cache.delete(self.marker_key)  # computed again at the next reading
+            return
+        generation = cache.get(self.marker_key)
+        if generation is None:
+            return  # computed from the database at the next reading
+        aggregate = SendingAggregate()
+        for answer in answers:
+            aggregate.add(
+                answer.person_id, answer.question_id, answer.answers_mask, answer.points
+            )
+        for key, delta in self.counters(generation, aggregate).items():
+            try:
+                cache.incr(key, delta)
+            except ValueError:  # first answer counted by this key
+                if not cache.add(key, delta, 2 * self.timeout):
+                    cache.incr(key, delta)
+
+    def rebuild(self):
+        generation = uuid.uuid4().hex[:8]
+        aggregate = SendingAggregate.from_database(self.quizz_sending_pk)
+        cache.set_many(self.counters(generation, aggregate), 2 * self.timeout)
+        cache.set(self.marker_key, generation, self.timeout)
+        return aggregate
+
+    def aggregate(self, person_pks, questions, with_picks=False):
+        """SendingAggregate of the persons and questions, read from the cache."""
+        generation = cache.get(self.marker_key)
+        if generation is None:
+            return self.rebuild()
+        key = partial(self.key, generation)
+        keys = [key("answers")]
+        for pk in person_pks:
+            keys += [key("person", pk, "answers"), key("person", pk, "points")]
+        for question in questions:
+            keys += [
+                key("question", question.pk, "answers"),
+                key("question", question.pk, "points"),
+            ]
+            if with_picks:
+                keys += [
+                    key("question", question.pk, "picks", index)
+                    for index in range(len(question.possible_answers))
+                ]
+        values = cache.get_many(keys)
+
+        aggregate = SendingAggregate(with_picks=with_picks)
+        aggregate.nb_answers = values.get(key("answers"), 0)
+        for pk in person_pks:
+            nb_answers = values.get(key("person", pk, "answers"), 0)
+            if nb_answers:
+                aggregate.answers_per_person[pk] = nb_answers
+                aggregate.points_per_person[pk] = (
+                    values.get(key("person", pk, "points"), 0) / 2
+                )
+        for question in questions:
+            pk = question.pk
+            nb_answers = values.get(key("question", pk, "answers"), 0)
+            if nb_answers:
+                aggregate.answers_per_question[pk] = nb_answers
+                aggregate.points_per_question[pk] = (
+                    values.get(key("question", pk, "points"), 0) / 2
+                )
+            if with_picks:
+                for index in range(len(question.possible_answers)):
+                    nb_picks = values.get(key("question", pk, "picks", index))
+                    if nb_picks:
+                        aggregate.picks[pk][index] = nb_picks
+        return aggregate
+
+
+def is_closed(quizz_sending):
+    return datetime.now(tz=get_fixed_timezone(1)) > quizz_sending.end_date
+
+
+def sending_statistics(quizz_sending, with_answers_stats, live=False):
+    """Context of the statistics page of a sending, without the QR code.
+
+    With live, the answers are counted by the LiveCounters of the sending.
+    """
+    questions = list(quizz_sending.quizz.questions.all())
+    names = group_names(quizz_sending.group)
+    if live:
+        aggregate = LiveCounters(quizz_sending.pk).aggregate(
+            names, questions, with_picks=with_answers_stats
+        )
+    else:
+        aggregate = SendingAggregate.from_database(
+            quizz_sending, with_picks=with_answers_stats
+        )
+
+    nb_questions = len(questions)
+    context = {
+        "nb_questions": nb_questions,
+        "total_questions": Progress(
+            value=aggregate.nb_answers, max_value=nb_questions * aggregate.nb_persons
+        ),
+        "persons_answered_questions": aggregate.persons_answered_questions(
+            names, nb_questions
+        ),
+        "persons_correct_questions": aggregate.persons_correct_questions(
+            names, nb_questions
+        ),
+        "questions": aggregate.questions(questions),
+        "questions_answers_stats": {},
+    }
+    if with_answers_stats:
+        context["questions_answers_stats"] = aggregate.questions_answers_stats(
+            questions
+        )
+    return context
+
+
+def freeze_statistics(context):
+    """JSON version of a sending_statistics() context."""
+    total = context["total_questions"]
+    return {
+        "nb_questions": context["nb_questions"],
+        "total_questions": [total.value, total.max_value],
+        "persons_answered_questions": [
+            statistics.as_list() for statistics in context["persons_answered_questions"]
+        ],
+        "persons_correct_questions": [
+            statistics.as_list() for statistics in context["persons_correct_questions"]
+        ],
+        "questions": [statistics.as_list() for statistics in context["questions"]],
+        # pairs rather than an object, to keep the order of the questions
+        "questions_answers_stats": [
+            [statement, [statistics.as_list() for statistics in answers_stats]]
+            for statement, answers_stats in context["questions_answers_stats"].items()
+        ],
+    }
+
+
+def thaw_statistics(frozen):
+    """sending_statistics() context from its freeze_statistics() version."""
+    return {
+        "nb_questions": frozen["nb_questions"],
+        "total_questions": Progress(*frozen["total_questions"]),
+        "persons_answered_questions": [
+            Statistics.from_list(values)
+            for values in frozen["persons_answered_questions"]
+        ],
+        "persons_correct_questions": [
+            Statistics.from_list(values)
+            for values in frozen["persons_correct_questions"]
+        ],
+        "questions": [
+            Statistics.from_list(values, html=True) for values in frozen["questions"]
+        ],
+        "questions_answers_stats": {
+            mark_safe(statement): [
+                Statistics.from_list(values, html=True) for values in answers_stats
+            ]
+            for statement, answers_stats in frozen["questions_answers_stats"]
+        },
+    }
+
+
+def student_statistics(person, offset, limit):
+    """Grades and answers of person to the started sendings, newest first.
+
+    Return {sending: [grade, then one Statistics per question]} for at most
+    limit sendings after the offset first ones, and whether there are
+    older ones. Three queries, whatever the number of sendings.
+    """
+    quizz_sendings = list(
+        QuizzSending.objects.filter(
+            started=True,
+            pk__in=Answer.objects.filter(person=person).values("quizz_sending"),
+        )
+        .select_related("quizz")
+        .order_by("-pk")[offset : offset + limit + 1]
+    )
+    has_older = len(quizz_sendings) > limit
+    quizz_sendings = quizz_sendings[:limit]
+
+    questions = defaultdict(list)
+    for quizz_question in (
+        Quizz.questions.through.objects.filter(
+            quizz__in={quizz_sending.quizz_id for quizz_sending in quizz_sendings}
+        )
+        .select_related("question")
+        .order_by("pk")
+    ):
+        questions[quizz_question.quizz_id].append(quizz_question.question)
+
+    answers = defaultdict(list)
+    for quizz_sending_pk, question_pk, points, chosen_answers in (
+        Answer.objects.filter(person=person, quizz_sending__in=quizz_sendings)
+        .order_by()
+        .values_list("quizz_sending", "question", "points", "answers")
+    ):
+        answers[quizz_sending_pk, question_pk].append((points, chosen_answers))
+
+    now = datetime.now(tz=get_fixed_timezone(1))
+    quizzes = {}
+    for quizz_sending in quizz_sendings:
+        show_answers = now > quizz_sending.end_date
+        statistics = []
+        total_points = 0
+        for question in questions[quizz_sending.quizz_id]:
+            question_answers = answers[quizz_sending.pk, question.pk]
+            nb_points = sum(points for points, _ in question_answers)
+            total_points += nb_points
+            answers_text = ""
+            if show_answers:
+                possible_answers = question.possible_answers_html
+                answers_text = "\n".join(
+                    "\n".join(
+                        possible_answers[index] for index in split_indexes(chosen)
+                    )
+                    for _, chosen in question_answers
+                )
+            statistics.append(
+                Statistics(
+                    text=question.statement_html,
+                    value=nb_points,
+                    max_value=1,
+                    extra_text=answers_text,
+                )
+            )
+        statistics.insert(
+            0,
+            Statistics(
+                text="Note du quiz", value=total_points, max_value=len(statistics)
+            ),
+        )
+        quizzes[quizz_sending] = statistics
+    return quizzes, has_older
+
+
+def detailed_csv_rows(quizz_sending):
+    """Rows of the detailed export: per question, points, answers and date.
+
+    The answers are read from a single cursor ordered by student, so that
+    only one row is in memory at a time.
+    """
+    questions = list(
+        quizz_sending.quizz.questions.order_by("pk").values_list("pk", "slug")
+    )
+    header = ["Nom"]
+    for _, slug in questions:
+        header += [f"{slug} points", f"{slug} réponses", f"{slug} date"]
+    yield header
+
+    names = group_names(quizz_sending.group)
+    rows = (
+        quizz_sending.group.persons.annotate(
+            sending_answers=FilteredRelation(
+                "answers", condition=Q(answers__quizz_sending=quizz_sending)
+            )
+        )
+        .order_by(
+            Upper("last_name"),
+            Upper("first_name"),
+            Upper("username"),
+            "pk",
+        )
+        .values_list(
+            "pk",
+            "sending_answers__question",
+            "sending_answers__points",
+            "sending_answers__answers",
+            "sending_answers__answered_at",
+        )
+    )
+    for person_pk, person_rows in groupby(
+        rows.iterator(chunk_size=2000), key=itemgetter(0)
+    ):
+        answers = {
+            question_pk: (points, chosen_answers, answered_at)
+            for _, question_pk, points, chosen_answers, answered_at in person_rows
+            if question_pk is not None
+        }
+        row = [names.get(person_pk, "")]
+        for question_pk, _ in questions:
+            if question_pk not in answers:
+                row += ["", "", ""]
+                continue
+            points, chosen_answers, answered_at = answers[question_pk]
+            row += [
+                number_format(points, decimal_pos=1),
+                chosen_answers,
+                (
+                    localtime(answered_at).strftime("%Y-%m-%d %H:%M:%S")
+                    if answered_at
+                    else ""
+                ),
+            ]
+        yield row
+
+
+def generate_qrcode(date_for_url, build_absolute_uri):
+    """URL of the QR code image leading to the answer form of a sending."""
+    url = build_absolute_uri(reverse("form", args=[date_for_url]))
+    qrcode_url = f"qrcodes/{date_for_url}.png"
+    fss = FileSystemStorage()
+    filepath = fss.path(qrcode_url)
+    if not fss.exists(filepath):
+        img = qrcode.make(url, error_correction=qrcode.constants.ERROR_CORRECT_H)
+        img.save(filepath)
+    return fss.url(qrcode_url)
+
+
+def build_statistics_snapshot(quizz_sending, qrcode_url):
+    """Compute and store the statistics of a closed sending."""
+    context = sending_statistics(quizz_sending, with_answers_stats=True)
+    csv = render_to_string(
+        "quizz/statistics.csv", {**context, "quizz_sending": quizz_sending}
+    )
+    snapshot, _ = StatisticsSnapshot.objects.update_or_create(
+        quizz_sending=quizz_sending,
+        defaults={
+            "context": freeze_statistics(context),
+            "csv": csv,
+            "qrcode": qrcode_url,
+        },
+    )
+    return snapshot
+
+
+def forget_statistics(**filters):
+    """Forget the statistics of the sendings matching filters.
+
+    The frozen statistics, the live counters and the cached statistics of
+    the students who answered are dropped.
+    """
+    quizz_sending_pks = list(
+        QuizzSending.objects.filter(**filters).values_list("pk", flat=True)
+    )
+    StatisticsSnapshot.objects.filter(quizz_sending__in=quizz_sending_pks).delete()
+    cache.delete_many([LiveCounters(pk).marker_key for pk in quizz_sending_pks])
+    drop_student_statistics(
+        Answer.objects.filter(quizz_sending__in=quizz_sending_pks)
+        .order_by()
+        .values_list("person", flat=True)
+        .distinct()
+    )
+
+
+def forget_statistics_on_commit(**filters):
+    """forget_statistics() once the transaction is committed.
+
+    Forgotten before, the statistics could be computed again from the former
+    data by a request and cached in the new generation.
+    """
+    transaction.on_commit(partial(forget_statistics, **filters))
+
+
+def student_generation_key(person_pk):
+    return f"quizz_student:{person_pk}:generation"
+
+
+def student_statistics_timeout(quizzes):
+    """Seconds until the answers of one of the quizzes are revealed."""
+    now = datetime.now(tz=get_fixed_timezone(1))
+    pending = [
+        (quizz_sending.end_date - now).total_seconds()
+        for quizz_sending in quizzes
+        if quizz_sending.end_date > now
+    ]
+    return max(1, int(min(pending, default=STUDENT_TIMEOUT)))
+
+
+def cached_student_statistics(person, offset, limit):
+    """student_statistics(), cached until the student's quizzes change.
+
+    The cached pages of a student belong to a generation: dropping the
+    generation key forgets all of them at once.
+    """
+    generation_key = student_generation_key(person.pk)
+    generation = cache.get(generation_key)
+    if generation is None:
+        generation = uuid.uuid4().hex[:8]
+        cache.set(generation_key, generation, STUDENT_TIMEOUT)
+    key = f"quizz_student:{person.pk}:{generation}:{offset}:{limit}"
+    statistics = cache.get(key)
+    if statistics is None:
+        statistics = student_statistics(person, offset, limit)
+        timeout = min(STUDENT_TIMEOUT, student_statistics_timeout(statistics[0]))
+        cache.set(key, statistics, timeout)
+    return statistics
+
+
+def drop_student_statistics(person_pks):
+    cache.delete_many([student_generation_key(pk) for pk in person_pks])
+
+
+# fields of a user shown by display_name()
+NAME_FIELDS = {"username", "email", "first_name", "last_name"}
+
+
+def display_name(user):
+    if user.first_name and user.last_name:
+        return f"{user.last_name.upper()} {user.first_name.title()}"
+    return f"{user.username.upper()} {user.email}"
+
+
+def names_key(group_pk):
+    return f"quizz_group_names:{group_pk}"
+
+
+def group_names(group):
+    """Display names of the group members, as {person pk: name}."""
+    key = names_key(group.pk)
+    names = cache.get(key)
+    if names is None:
+        persons = group.persons.order_by().only(*NAME_FIELDS)
+        names = {person.pk: display_name(person) for person in persons}
+        cache.set(key, names, NAMES_TIMEOUT)
+    return names
+
+
+def drop_group_names(group_pks):
+    cache.delete_many([names_key(group_pk) for group_pk in group_pks])
+
+
+@receiver(post_save, sender=User)
+@receiver(pre_delete, sender=User)
+def drop_user_names(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and NAME_FIELDS.isdisjoint(update_fields):
+        return  # such as last_login, at each login
+    drop_group_names(
+        Group.persons.through.objects.filter(user=instance).values_list(
+            "group_id", flat=True
+        )
+    )
+
+
+@receiver(m2m_changed, sender=Group.persons.through)
+def drop_members_names(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_") and action != "pre_clear":
+        return
+    if not reverse:
+        drop_group_names([instance.pk])
+    elif action == "pre_clear":  # user.pyquizz_groups cleared
+        drop_user_names(sender=User, instance=instance)
+    elif pk_set:  # user.pyquizz_groups changed
+        drop_group_names(pk_set)
+
+
+@receiver(answers_recorded)
+def count_recorded_answers(sender, answers, **kwargs):
+    answers_per_sending = defaultdict(list)
+    for answer in answers:
+        answers_per_sending[answer.quizz_sending_id].append(answer)
+    for quizz_sending_pk, sending_answers in answers_per_sending.items():
+        LiveCounters(quizz_sending_pk).add(sending_answers)
+    drop_student_statistics({answer.person_id for answer in answers})
+
+
+# sendings and students of the answers saved or deleted one by one, handled
+# once the transaction is committed, so that a cascade deleting the answers
+# of a sending, question or student costs no query per answer
+changed_answers = threading.local()
+
+
+def forget_changed_answers():
+    quizz_sending_pks = getattr(changed_answers, "quizz_sendings", set())
+    person_pks = getattr(changed_answers, "persons", set())
+    changed_answers.quizz_sendings, changed_answers.persons = set(), set()
+    if quizz_sending_pks:  # else done by a previous callback
+        QuizzSending.objects.filter(pk__in=quizz_sending_pks).reconcile_counters()
+        forget_statistics(pk__in=quizz_sending_pks)
+        drop_student_statistics(person_pks)  # even if their answers were deleted
+
+
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def drop_answer_statistics(sender, instance, **kwargs):
+    if not hasattr(changed_answers, "quizz_sendings"):
+        changed_answers.quizz_sendings, changed_answers.persons = set(), set()
+    changed_answers.quizz_sendings.add(instance.quizz_sending_id)
+    changed_answers.persons.add(instance.person_id)
+    transaction.on_commit(forget_changed_answers)
+
+
+@receiver(answers_rescored)
+def drop_rescored_statistics(sender, question, **kwargs):
+    forget_statistics_on_commit(quizz__questions=question)
+
+
+@receiver(post_save, sender=QuizzSending)
+def drop_sending_statistics(sender, instance, created, **kwargs):
+    if not created:  # the end date may have moved
+        forget_statistics_on_commit(pk=instance.pk)
+
+
+@receiver(post_save, sender=Question)
+def drop_question_statistics(sender, instance, **kwargs):
+    forget_statistics_on_commit(quizz__questions=instance)
+
+
+@receiver(m2m_changed, sender=Quizz.questions.through)
+def drop_quizz_statistics(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        forget_statistics_on_commit(quizz=instance)
+    elif pk_set:  # question.quizzes changed
+        forget_statistics_on_commit(quizz__in=pk_set)
+    else:
+        forget_statistics_on_commit()
@@ -1,3 +1,921 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import re
+import tempfile
+from importlib import import_module
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from unittest import skipUnless
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User, update_last_login
+from django.core.cache import cache
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.utils import timezone
+
+from .forms import academic_year
+from .gradebook import Gradebook
+from .models import (
+    Answer,
+    Group,
+    Question,
+    Quizz,
+    QuizzSending,
+    ReviewAnswer,
+    answer_points,
+    indexes_to_mask,
+    mask_to_indexes,
+    split_indexes,
+)
+from .snapshots import build_snapshot, get_snapshot
+from .statistics import (
+    LiveCounters,
+    SendingAggregate,
+    count_recorded_answers,
+    group_names,
+)
+from .writer import AnswerWriter, PendingAnswer
+
+
+class QuizzFixtureMixin:
+    """Students who answered closed quizz sendings of their group and a running one.
+
+    The student logged in also belongs to other groups, each with a quizz sent
+    to it, and has not answered the running sending yet. The number of rows
+    of each table grows with scale.
+    """
+
+    scale = 1
+
+    @classmethod
+    def setUpClass(cls):
+        # QR codes of the statistics pages are written in the media
+        media_root = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(media_root.cleanup)
+        os.mkdir(os.path.join(media_root.name, "qrcodes"))
+        # the tests empty the cache, which must not be the one of the site
+        test_settings = override_settings(
+            MEDIA_ROOT=media_root.name,
+            CACHES={
+                "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+            },
+        )
+        test_settings.enable()
+        cls.addClassCleanup(test_settings.disable)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        scale = cls.scale
+        cls.groups = [
+            Group.objects.create(name=f"Groupe {index}", slug=f"groupe-{index}")
+            for index in range(2 * scale)
+        ]
+        cls.group = cls.groups[0]
+        cls.students = [
+            User.objects.create_user(
+                f"eleve{index}",
+                f"eleve{index}@example.com",
+                first_name="Prénom",
+                last_name=f"Nom{index}",
+            )
+            for index in range(4 * scale)
+        ]
+        cls.student = cls.students[-1]
+        cls.teacher = User.objects.create_user("prof", is_staff=True)
+        cls.group.persons.add(*cls.students)
+        cls.student.pyquizz_groups.add(*cls.groups)
+        cls.questions = []
+        for index in range(3 * scale):
+            question = Question(
+                statement=f"Question {index}",
+                slug=f"question-{index}",
+                answers="oui\n----\nnon\n----\npeut-être",
+                correct_answers="0,2" if index % 2 else "1",
+            )
+            question.save()
+            cls.questions.append(question)
+        cls.quizzes = []
+        for group in cls.groups:
+            quizz = Quizz.objects.create(
+                name=f"Quizz {group.name}",
+                slug=f"quizz-{group.slug}",
+                random_question_order=False,
+            )
+            quizz.questions.add(*cls.questions)
+            cls.quizzes.append(quizz)
+        cls.quizz = cls.quizzes[0]
+
+        now = timezone.now().replace(second=0, microsecond=0)
+        cls.quizz_sendings = [
+            QuizzSending.objects.create(
+                quizz=cls.quizz,
+                group=cls.group,
+                date=now - timedelta(days=index),
+                end_date=now + timedelta(hours=1) if index == 0 else now,
+                started=True,
+            )
+            for index in range(3 * scale)
+        ]
+        cls.running_sending = cls.quizz_sendings[0]
+        cls.closed_sending = cls.quizz_sendings[-1]
+        for index, (group, quizz) in enumerate(zip(cls.groups[1:], cls.quizzes[1:])):
+            QuizzSending.objects.create(
+                quizz=quizz,
+                group=group,
+                date=now - timedelta(days=index, hours=1),
+                end_date=now,
+                started=True,
+            )
+        Answer.objects.record(
+            [
+                Answer.from_indexes(
+                    [index % 3], question, quizz_sending=quizz_sending, person=student
+                )
+                for quizz_sending in cls.quizz_sendings
+                for student in cls.students
+                for index, question in enumerate(cls.questions)
+                if quizz_sending != cls.running_sending or student != cls.student
+            ]
+        )
+        cls.review = f"B1a-{date.today().year}"
+        ReviewAnswer.objects.bulk_create(
+            ReviewAnswer(
+                review=cls.review,
+                email=student.email,
+                easiest="les listes",
+                hardest="les dictionnaires",
+            )
+            for student in cls.students
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.student)
+
+    def quizz_urls(self):
+        """URL of each page of the site about quizzes, with its name."""
+        running = self.running_sending.date_for_url
+        closed = self.closed_sending.date_for_url
+        return [
+            ("review_form", reverse("review_form", args=[self.review])),
+            ("review_answer", reverse("review_answer", args=[self.review])),
+            ("form", reverse("form", args=[running])),
+            ("wait_for_start", reverse("wait_for_start", args=[running])),
+            ("running_statistics", reverse("quizz_statistics", args=[running])),
+            ("running_statistics_csv", reverse("quizz_statistics_csv", args=[running])),
+            ("quizz_statistics", reverse("quizz_statistics", args=[closed])),
+            ("quizz_statistics_csv", reverse("quizz_statistics_csv", args=[closed])),
+            ("group_gradebook", reverse("group_gradebook", args=[self.group.slug])),
+            (
+                "group_gradebook_csv",
+                reverse("group_gradebook_csv", args=[self.group.slug]),
+            ),
+            ("quizz_statistics_list", reverse("quizz_statistics_list")),
+            ("quizz_help", reverse("quizz_help")),
+            ("update_profile", reverse("update_profile")),
+            ("upload", reverse("upload", args=["projet"])),
+            ("student_statistics", reverse("student_statistics")),
+            ("student_statistics_fragment", reverse("student_statistics_fragment")),
+        ]
+
+    def staff_urls(self):
+        """URL of each page only shown to the staff, with its name."""
+        closed = self.closed_sending.date_for_url
+        return [
+            (
+                "quizz_statistics_detailed_csv",
+                reverse("quizz_statistics_detailed_csv", args=[closed]),
+            ),
+        ]
+
+    def visited_urls(self):
+        """quizz_urls() visited by the student, then staff_urls() by a teacher."""
+        yield from self.quizz_urls()
+        self.client.force_login(self.teacher)
+        yield from self.staff_urls()
+
+    def get(self, url):
+        response = self.client.get(url, secure=True)
+        self.assertLess(response.status_code, 400, url)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response
+
+
+def former_nb_points(question, answers):
+    """Question.nb_points before the answers were stored as bitmasks."""
+    if question.auto_evaluation:
+        ret = 0
+        for chosen in answers.split(","):
+            if chosen:
+                ret = min(2, max(int(chosen), ret))
+        return ret / 2
+    points = 1.0
+    correct_answers = question.correct_answers.split(",")
+    answers = answers.split(",")
+    for answer in correct_answers:
+        if answer not in answers:
+            points -= 0.5
+    for answer in answers:
+        if answer not in correct_answers:
+            points -= 0.5
+    return max(0, points)
+
+
+class ScoringTest(TestCase):
+    """Points of the answers to questions with 5 possible answers."""
+
+    nb_answers = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.masks = range(1 << cls.nb_answers)
+        cls.questions = []
+        for correct_mask in cls.masks[1:]:
+            question = Question(
+                statement=f"Question {correct_mask}",
+                slug=f"question-{correct_mask}",
+                answers="\n----\n".join(map(str, range(cls.nb_answers))),
+                correct_answers=",".join(map(str, mask_to_indexes(correct_mask))),
+            )
+            question.save()
+            cls.questions.append(question)
+        auto_evaluation = Question(
+            statement="Auto-évaluation",
+            slug="auto-evaluation",
+            answers="\n----\n".join(map(str, range(cls.nb_answers))),
+            correct_answers="0",
+            auto_evaluation=True,
+        )
+        auto_evaluation.save()
+        cls.questions.append(auto_evaluation)
+        quizz = Quizz.objects.create(name="Quizz", slug="quizz")
+        quizz.questions.add(*cls.questions)
+        cls.quizz_sending = QuizzSending.objects.create(
+            quizz=quizz,
+            group=Group.objects.create(name="Groupe", slug="groupe"),
+            date=timezone.now(),
+            end_date=timezone.now(),
+        )
+        cls.persons = User.objects.bulk_create(
+            User(username=f"eleve{mask}") for mask in cls.masks
+        )
+        Answer.objects.bulk_create(
+            Answer.from_indexes(
+                mask_to_indexes(mask),
+                question,
+                quizz_sending=cls.quizz_sending,
+                person=cls.persons[mask],
+            )
+            for question in cls.questions
+            for mask in cls.masks
+        )
+
+    def test_masks(self):
+        for mask in self.masks:
+            self.assertEqual(indexes_to_mask(mask_to_indexes(mask)), mask)
+        self.assertEqual(indexes_to_mask(split_indexes("1,10")), 0b10000000010)
+
+    def test_same_points_as_before(self):
+        # no empty choice, which the former scoring counted as a wrong answer
+        for question in self.questions:
+            for mask in self.masks[1:]:
+                answers = ",".join(map(str, mask_to_indexes(mask)))
+                with self.subTest(question=question.statement, answers=answers):
+                    self.assertEqual(
+                        answer_points(
+                            mask,
+                            question.correct_answers_mask,
+                            question.auto_evaluation,
+                        ),
+                        former_nb_points(question, answers),
+                    )
+
+    def test_sql_points(self):
+        for question in self.questions:
+            answers = Answer.objects.filter(question=question).annotate(
+                sql_points=question.points_expression()
+            )
+            for answers_mask, points, sql_points in answers.values_list(
+                "answers_mask", "points", "sql_points"
+            ):
+                with self.subTest(question=question.statement, mask=answers_mask):
+                    self.assertEqual(sql_points, points)
+                    self.assertEqual(
+                        points,
+                        answer_points(
+                            answers_mask,
+                            question.correct_answers_mask,
+                            question.auto_evaluation,
+                        ),
+                    )
+
+    def test_migrations_fill_masks_and_points(self):
+        expected = list(
+            Answer.objects.order_by("pk").values_list("answers_mask", "points")
+        )
+        Answer.objects.update(answers_mask=0, points=-1)
+        Question.objects.update(correct_answers_mask=0)
+        import_module("quizz.migrations.0024_answers_masks").fill_masks(apps, None)
+        import_module("quizz.migrations.0026_answer_points").fill_points(apps, None)
+        self.assertEqual(
+            list(Question.objects.order_by("pk").values_list("correct_answers_mask")),
+            [(question.correct_answers_mask,) for question in self.questions],
+        )
+        self.assertEqual(
+            list(Answer.objects.order_by("pk").values_list("answers_mask", "points")),
+            expected,
+        )
+
+    def test_answer_10_is_not_answer_1(self):
+        question = Question(
+            statement="Onze réponses",
+            slug="onze-reponses",
+            answers="\n----\n".join(map(str, range(11))),
+            correct_answers="1",
+        )
+        question.save()
+        Answer.objects.create(
+            quizz_sending=self.quizz_sending,
+            person=self.persons[0],
+            question=question,
+            answers="10",
+        )
+        aggregate = SendingAggregate.from_database(self.quizz_sending)
+        self.assertEqual(aggregate.picks[question.pk], {10: 1})
+        self.assertEqual(aggregate.points_per_question[question.pk], 0)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class GradebookTest(TestCase):
+    """Four students, three sendings of two questions, and a former member."""
+
+    # points of each student to each sending, None without any answer
+    points = {
+        "A": [2, 1, 2],
+        "B": [1.5, 2, 0],
+        "C": [1.5, 2, None],
+        "D": [None, None, 1],
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(name="Groupe", slug="groupe")
+        students = {
+            name: User.objects.create_user(
+                f"eleve{name}", first_name="Prénom", last_name=name
+            )
+            for name in cls.points
+        }
+        cls.group.persons.add(*students.values())
+        former_member = User.objects.create_user("ancien")
+        questions = []
+        for index in range(2):
+            question = Question(
+                statement=f"Question {index}",
+                slug=f"question-{index}",
+                answers="oui\n----\nnon",
+                correct_answers="0",
+            )
+            question.save()
+            questions.append(question)
+        quizz = Quizz.objects.create(name="Quizz", slug="quizz")
+        quizz.questions.add(*questions)
+        now = timezone.now()
+        quizz_sendings = [
+            QuizzSending.objects.create(
+                quizz=quizz,
+                group=cls.group,
+                date=now - timedelta(days=3 - index),
+                end_date=now,
+                started=True,
+            )
+            for index in range(3)
+        ]
+        # not started, left out
+        QuizzSending.objects.create(
+            quizz=quizz, group=cls.group, date=now, end_date=now
+        )
+        answers = [
+            Answer(
+                quizz_sending=quizz_sendings[0],
+                person=former_member,
+                question=question,
+                answers="0",
+                points=1,
+            )
+            for question in questions
+        ]
+        for name, student_points in cls.points.items():
+            for quizz_sending, total in zip(quizz_sendings, student_points):
+                if total is None:
+                    continue
+                # the first question gets at most one point
+                for question, points in zip(questions, [min(1, total), total - 1]):
+                    if points >= 0:
+                        answers.append(
+                            Answer(
+                                quizz_sending=quizz_sending,
+                                person=students[name],
+                                question=question,
+                                answers="0",
+                                points=points,
+                            )
+                        )
+        Answer.objects.bulk_create(answers)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_students(self):
+        self.assertEqual(
+            list(Gradebook(self.group).students()),
+            [
+                ("A Prénom", [20.0, 10.0, 20.0], 16.67, 20.0, 1),
+                ("B Prénom", [15.0, 20.0, 0.0], 11.67, 15.0, 2),
+                ("C Prénom", [15.0, 20.0, 0.0], 11.67, 15.0, 2),
+                ("D Prénom", [0.0, 0.0, 10.0], 3.33, 0.0, 4),
+            ],
+        )
+
+    def test_sendings(self):
+        self.assertEqual(
+            [(mean, std) for _, mean, std in Gradebook(self.group).sendings()],
+            [(12.5, 7.5), (12.5, 8.29), (7.5, 8.29)],
+        )
+
+    def test_csv(self):
+        response = self.client.get(
+            reverse("group_gradebook_csv", args=[self.group.slug]), secure=True
+        )
+        rows = list(csv.reader(response.content.decode().splitlines(), delimiter=";"))
+        self.assertEqual(len(rows[0]), 1 + 3 + 3)
+        self.assertEqual(
+            rows[1:],
+            [
+                ["A Prénom", "20,00", "10,00", "20,00", "16,67", "20,00", "1"],
+                ["B Prénom", "15,00", "20,00", "0,00", "11,67", "15,00", "2"],
+                ["C Prénom", "15,00", "20,00", "0,00", "11,67", "15,00", "2"],
+                ["D Prénom", "0,00", "0,00", "10,00", "3,33", "0,00", "4"],
+                ["Moyenne", "12,50", "12,50", "7,50"],
+                ["Écart type", "7,50", "8,29", "8,29"],
+            ],
+        )
+
+
+class AdminChangelistTest(TestCase):
+    nb_questions = 100
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com")
+        questions = []
+        for index in range(cls.nb_questions):
+            question = Question(
+                statement=f"Question {index}",
+                slug=f"question-{index}",
+                answers="oui\n----\nnon",
+                correct_answers="0",
+            )
+            question.save()
+            questions.append(question)
+        for index in range(10):
+            quizz = Quizz.objects.create(name=f"Quizz {index}", slug=f"quizz-{index}")
+            quizz.questions.add(*questions[index::5])
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def get_changelist(self, model_name):
+        url = reverse(f"admin:quizz_{model_name}_changelist")
+        response = self.client.get(url, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_question_changelist(self):
+        # session, user, 2 counts, questions, quizzes of the questions
+        with self.assertNumQueries(6):
+            response = self.get_changelist("question")
+        self.assertContains(response, "Quizz 0 (20 questions, 5.0 minutes)")
+
+    def test_quizz_changelist(self):
+        # session, user, 2 counts, quizzes, questions of the quizzes
+        with self.assertNumQueries(6):
+            response = self.get_changelist("quizz")
+        self.assertContains(response, "Question 99")
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN is specific to SQLite")
+class QueryPlanTest(QuizzFixtureMixin, TestCase):
+    def quizz_urls(self):
+        # the whole list of sendings is sorted by group name, reading every
+        # sending: it is filtered here, the filters must use an index
+        day = self.closed_sending.date.date()
+        filters = [
+            {"group": self.group.pk},
+            {"academic_year": academic_year(day)},
+            {"date_from": day.isoformat(), "date_to": day.isoformat()},
+        ]
+        urls = []
+        for name, url in super().quizz_urls():
+            if name != "quizz_statistics_list":
+                urls.append((name, url))
+                continue
+            urls += [(name, f"{url}?{urlencode(query)}") for query in filters]
+        return urls
+
+    def explain(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def full_scans(self, sql, params):
+        """Tables read row by row, without any index, by the query."""
+        return {
+            match[1]
+            for match in map(
+                re.compile(r"SCAN (\w+)").fullmatch, self.explain(sql, params)
+            )
+            if match
+        }
+
+    def test_no_full_scan(self):
+        for name, url in self.visited_urls():
+            queries = []
+
+            def record(execute, sql, params, many, context):
+                queries.append((sql, params))
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(record):
+                self.get(url)
+            for sql, params in queries:
+                if not sql.startswith("SELECT"):
+                    continue
+                with self.subTest(url=url, sql=sql):
+                    self.assertEqual(self.full_scans(sql, params), set())
+
+    def test_user_email_index(self):
+        users = User.objects.filter(email__iexact="ELEVE1@example.com")
+        sql, params = users.query.sql_with_params()
+        self.assertIn("auth_user_email_idx", " ".join(self.explain(sql, params)))
+        self.assertEqual(users.get(), self.students[1])
+
+
+class StatisticsListTest(QuizzFixtureMixin, TestCase):
+    def test_order(self):
+        response = self.client.get(reverse("quizz_statistics_list"), secure=True)
+        sendings = list(response.context["quizz_sendings"])
+        # sendings of each group, from the oldest one
+        self.assertEqual(
+            sendings, sorted(sendings, key=lambda qs: (qs.group.name, qs.date))
+        )
+        self.assertGreater(len(sendings), 1)
+
+    def test_date_filter(self):
+        day = timezone.localdate(self.closed_sending.date)
+        response = self.client.get(
+            reverse("quizz_statistics_list"),
+            {"date_from": day.isoformat(), "date_to": day.isoformat()},
+            secure=True,
+        )
+        self.assertEqual(
+            {quizz_sending.pk for quizz_sending in response.context["quizz_sendings"]},
+            {
+                quizz_sending.pk
+                for quizz_sending in QuizzSending.objects.all()
+                if timezone.localdate(quizz_sending.date) == day
+            },
+        )
+        self.assertIn(self.closed_sending, response.context["quizz_sendings"])
+
+
+class DetailedCSVTest(QuizzFixtureMixin, TestCase):
+    def url(self, quizz_sending):
+        return reverse(
+            "quizz_statistics_detailed_csv", args=[quizz_sending.date_for_url]
+        )
+
+    def test_refused_to_students(self):
+        for quizz_sending in [self.running_sending, self.closed_sending]:
+            with self.subTest(quizz_sending=quizz_sending):
+                response = self.client.get(self.url(quizz_sending), secure=True)
+                self.assertEqual(response.status_code, 404)
+
+    def test_refused_to_anonymous_visitors(self):
+        self.client.logout()
+        for quizz_sending in [self.running_sending, self.closed_sending]:
+            with self.subTest(quizz_sending=quizz_sending):
+                response = self.client.get(self.url(quizz_sending), secure=True)
+                self.assertEqual(response.status_code, 404)
+
+    def test_staff(self):
+        self.client.force_login(self.teacher)
+        for quizz_sending in [self.running_sending, self.closed_sending]:
+            with self.subTest(quizz_sending=quizz_sending):
+                response = self.get(self.url(quizz_sending))
+                self.assertEqual(response["Content-Type"], "text/csv")
+
+
+class WaitForStartTest(QuizzFixtureMixin, TestCase):
+    def wait(self):
+        url = reverse("wait_for_start", args=[self.running_sending.date_for_url])
+        return self.get(url).json()["started"]
+
+    def test_not_started_from_the_cache(self):
+        QuizzSending.objects.filter(pk=self.running_sending.pk).update(started=False)
+        self.assertFalse(self.wait())
+        with self.assertNumQueries(0):
+            self.assertFalse(self.wait())
+
+    def test_started_checked_in_the_database(self):
+        self.running_sending.started = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.running_sending.save()
+        self.assertFalse(self.wait())
+        self.running_sending.started = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.running_sending.save()
+        self.assertTrue(self.wait())
+        # stopped by another process, whose cache was not shared
+        QuizzSending.objects.filter(pk=self.running_sending.pk).update(started=False)
+        self.assertFalse(self.wait())
+
+
+class SnapshotTest(QuizzFixtureMixin, TestCase):
+    def test_deleted_question_drops_the_snapshot(self):
+        build_snapshot(self.running_sending)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.questions[0].delete()
+        self.assertIsNone(get_snapshot(self.running_sending.date_for_url))
+
+    def test_saved_question_drops_the_snapshot_once_committed(self):
+        build_snapshot(self.running_sending)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.questions[0].save()
+        self.assertIsNotNone(get_snapshot(self.running_sending.date_for_url))
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(get_snapshot(self.running_sending.date_for_url))
+
+    def test_saved_quizz_drops_the_snapshot(self):
+        build_snapshot(self.running_sending)
+        self.quizz.random_question_order = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.quizz.save()
+        self.assertIsNone(get_snapshot(self.running_sending.date_for_url))
+
+    def test_deleted_sending_drops_the_snapshot(self):
+        build_snapshot(self.running_sending)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.running_sending.delete()
+        self.assertIsNone(get_snapshot(self.running_sending.date_for_url))
+
+
+class RescoringTest(QuizzFixtureMixin, TestCase):
+    def test_saved_question_rescores_its_answers(self):
+        question = Question.objects.get(pk=self.questions[0].pk)
+        question.correct_answers = "0"
+        with self.captureOnCommitCallbacks(execute=True):
+            question.save()
+        question.refresh_from_db()
+        self.assertFalse(question.needs_rescoring)
+        for answer in Answer.objects.filter(question=question):
+            self.assertEqual(answer.points, answer.question.nb_points(answer))
+        self.closed_sending.refresh_from_db()
+        self.assertEqual(
+            self.closed_sending.total_points,
+            sum(self.closed_sending.answers.values_list("points", flat=True)),
+        )
+
+
+class LiveCountersTest(QuizzFixtureMixin, TestCase):
+    scale = 3
+
+    def burst(self):
+        """Count the answers to the running sending from concurrent threads."""
+        self.running_sending.answers.all().delete()
+        counters = LiveCounters(self.running_sending.pk)
+        counters.rebuild()
+        answers = Answer.objects.bulk_create(
+            Answer.from_indexes(
+                [index % 3],
+                question,
+                quizz_sending=self.running_sending,
+                person=student,
+            )
+            for student in self.students
+            for index, question in enumerate(self.questions)
+        )
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for answer in answers:
+                executor.submit(count_recorded_answers, sender=Answer, answers=[answer])
+        return counters.aggregate(
+            group_names(self.group), self.questions, with_picks=True
+        )
+
+    def assertSameAggregate(self, aggregate):
+        expected = SendingAggregate.from_database(self.running_sending)
+        self.assertEqual(aggregate.nb_answers, expected.nb_answers)
+        for counter in [
+            "answers_per_person",
+            "points_per_person",
+            "answers_per_question",
+            "points_per_question",
+        ]:
+            self.assertEqual(getattr(aggregate, counter), getattr(expected, counter))
+        self.assertEqual(
+            {pk: picks for pk, picks in aggregate.picks.items() if picks},
+            expected.picks,
+        )
+
+    def test_saved_question_drops_the_counters_once_committed(self):
+        counters = LiveCounters(self.running_sending.pk)
+        counters.rebuild()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.questions[0].save()
+        self.assertIsNotNone(cache.get(counters.marker_key))
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(cache.get(counters.marker_key))
+
+    def test_atomic_cache(self):
+        self.assertSameAggregate(self.burst())
+
+    def test_file_cache(self):
+        with tempfile.TemporaryDirectory() as location:
+            backend = "django.core.cache.backends.filebased.FileBasedCache"
+            with self.settings(
+                CACHES={"default": {"BACKEND": backend, "LOCATION": location}}
+            ):
+                self.assertSameAggregate(self.burst())
+
+
+class AnswerRecordTest(QuizzFixtureMixin, TestCase):
+    def answer(self, question):
+        return Answer.from_indexes(
+            [0], question, quizz_sending=self.running_sending, person=self.student
+        )
+
+    def test_answered_question(self):
+        Answer.objects.record([self.answer(self.questions[0])])
+        inserted = Answer.objects.record(
+            [self.answer(question) for question in self.questions[:2]]
+        )
+        self.assertEqual([answer.question for answer in inserted], self.questions[1:2])
+        self.assertEqual(Answer.objects.record([self.answer(self.questions[0])]), [])
+
+    def test_other_integrity_error(self):
+        invalid = self.answer(self.questions[1])
+        invalid.answers = None
+        with self.assertRaises(IntegrityError):
+            Answer.objects.record([self.answer(self.questions[0]), invalid])
+        self.assertFalse(
+            self.running_sending.answers.filter(person=self.student).exists()
+        )
+
+
+class AnswerWriterTest(QuizzFixtureMixin, TestCase):
+    def pending(self, question):
+        return PendingAnswer(
+            Answer.from_indexes(
+                [0], question, quizz_sending=self.running_sending, person=self.student
+            )
+        )
+
+    def test_batch_with_a_duplicate(self):
+        batch = [
+            self.pending(self.questions[0]),
+            self.pending(self.questions[0]),
+            self.pending(self.questions[1]),
+        ]
+        AnswerWriter().write(batch)
+        self.assertEqual(
+            [(pending.inserted, pending.error) for pending in batch],
+            [(True, None), (False, None), (True, None)],
+        )
+        self.assertEqual(
+            self.running_sending.answers.filter(person=self.student).count(), 2
+        )
+
+    def test_faulty_answer(self):
+        invalid = self.pending(self.questions[1])
+        invalid.answer.answers = None
+        batch = [self.pending(self.questions[0]), invalid]
+        AnswerWriter().write(batch)
+        self.assertTrue(batch[0].inserted)
+        self.assertIsNone(batch[0].error)
+        self.assertIsInstance(invalid.error, IntegrityError)
+
+
+class AnswerSignalsTest(QuizzFixtureMixin, TestCase):
+    scale = 10
+
+    def test_deleted_student(self):
+        nb_answers = self.students[0].answers.count()
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.students[0].delete()
+        # the answers are deleted in batches, without any query per answer
+        self.assertLess(len(queries), nb_answers / 10)
+        self.closed_sending.refresh_from_db()
+        self.assertEqual(self.closed_sending.nb_participants, len(self.students) - 1)
+
+
+class GroupNamesTest(QuizzFixtureMixin, TestCase):
+    def test_login_keeps_the_names(self):
+        group_names(self.group)
+        update_last_login(None, self.student)
+        with self.assertNumQueries(0):
+            group_names(self.group)
+
+    def test_renamed_student(self):
+        group_names(self.group)
+        self.student.last_name = "Renommé"
+        self.student.save(update_fields=["last_name"])
+        self.assertIn("RENOMMÉ Prénom", group_names(self.group).values())
+
+
+class QueryBudgetTest(QuizzFixtureMixin, TestCase):
+    """Number of queries of each page, which must not grow with the data.
+
+    The cache is emptied before each page, the budgets are the ones of the
+    first visit.
+    """
+
+    budgets = {
+        "review_form": 3,
+        "review_answer": 4,
+        "form": 7,
+        "wait_for_start": 1,
+        "running_statistics": 7,
+        "running_statistics_csv": 4,
+        # statistics frozen at the first visit, then read by the CSV
+        "quizz_statistics": 13,
+        "quizz_statistics_csv": 1,
+        "group_gradebook": 7,
+        "group_gradebook_csv": 4,
+        "quizz_statistics_list": 7,
+        "quizz_help": 4,
+        "update_profile": 3,
+        "upload": 3,
+        "student_statistics": 6,
+        "student_statistics_fragment": 5,
+        # staff_urls(), with the session and the user
+        "quizz_statistics_detailed_csv": 6,
+    }
+    admin_budgets = {
+        "quizz.answer": 7,
+        "quizz.question": 6,
+        "quizz.quizz": 6,
+        "quizz.quizzsending": 6,
+        "quizz.group": 5,
+        "quizz.reviewanswer": 5,
+        "auth.user": 6,
+    }
+
+    def test_pages(self):
+        for name, url in self.visited_urls():
+            cache.clear()
+            with self.subTest(url=url), self.assertNumQueries(self.budgets[name]):
+                self.get(url)
+
+    def test_admin_changelists(self):
+        self.client.force_login(User.objects.create_superuser("admin"))
+        for model, budget in self.admin_budgets.items():
+            cache.clear()
+            url = reverse("admin:{}_{}_changelist".format(*model.split(".")))
+            with self.subTest(url=url), self.assertNumQueries(budget):
+                self.get(url)
+
+    def test_help_lists_latest_sendings(self):
+        response = self.get(reverse("quizz_help"))
+        self.assertEqual(len(response.context["quizzes"]), len(self.groups))
+        self.assertEqual(
+            response.context["quizzes"][0],
+            (self.running_sending.get_absolute_url(), self.quizz.name),
+        )
+
+    def test_bulk_answers(self):
+        answers = {question.pk: [1] for question in self.questions}
+        url = reverse("form_bulk", args=[self.running_sending.date_for_url])
+        with self.assertNumQueries(14):
+            response = self.client.post(
+                url,
+                json.dumps({"answers": answers}),
+                content_type="application/json",
+                secure=True,
+            )
+        self.assertEqual(response.json()["results"], {str(pk): [] for pk in answers})
+
+
+class ScaledQueryBudgetTest(QueryBudgetTest):
+    scale = 10
@@ -5,15 +5,21 @@ from django.urls import path, register_converter
 
 from quizz.views import (
     AnswerAQuestion,
+    AnswerAQuizz,
+    GroupGradebook,
+    GroupGradebookCSV,
     HelpView,
     QuizzStatistics,
     QuizzStatisticsCSV,
+    QuizzStatisticsDetailedCSV,
     QuizzStatisticsList,
     Review,
     ReviewAnswer,
     StudentStatistics,
+    StudentStatisticsFragment,
     UpdateProfile,
     UploadFile,
+    WaitForStart,
 )
 
 
@@ -104,14 +110,31 @@ urlpatterns = [
         name="review_answer",
     ),
     path("<date:date>/", AnswerAQuestion.as_view(), name="form"),
+    path("<date:date>/reponses/", AnswerAQuizz.as_view(), name="form_bulk"),
+    path("<date:date>/attente/", WaitForStart.as_view(), name="wait_for_start"),
     path(
         "statistiques/<date:date>/csv",
         QuizzStatisticsCSV.as_view(content_type="text/plain"),
         name="quizz_statistics_csv",
     ),
+    path(
+        "statistiques/<date:date>/csv/detail",
+        QuizzStatisticsDetailedCSV.as_view(),
+        name="quizz_statistics_detailed_csv",
+    ),
     path(
         "statistiques/<date:date>/", QuizzStatistics.as_view(), name="quizz_statistics"
     ),
+    path(
+        "statistiques/groupe/<slug:group>/",
+        GroupGradebook.as_view(),
+        name="group_gradebook",
+    ),
+    path(
+        "statistiques/groupe/<slug:group>/csv",
+        GroupGradebookCSV.as_view(),
+        name="group_gradebook_csv",
+    ),
     path(
         "statistiques/",
         QuizzStatisticsList.as_view(),
@@ -120,5 +143,10 @@ urlpatterns = [
     path("aide/", HelpView.as_view(), name="quizz_help"),
     path("profil/", UpdateProfile.as_view(), name="update_profile"),
     path("upload/<slug:category>/", UploadFile.as_view(), name="upload"),
+    path(
+        "statistiques/eleve/",
+        StudentStatisticsFragment.as_view(),
+        name="student_statistics_fragment",
+    ),
     path("", StudentStatistics.as_view(), name="student_statistics"),
 ]
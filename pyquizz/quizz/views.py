@@ -1,20 +1,20 @@
-import random
-from collections import defaultdict, namedtuple
-from datetime import datetime
-from typing import Dict, List
+import csv
+import json
 
-import qrcode
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.contrib.auth.models import User
 from django.contrib.messages.views import SuccessMessageMixin
 from django.core.files.storage import FileSystemStorage
-from django.shortcuts import render
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import NullIf
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render
 from django.template.defaultfilters import register
 from django.urls import reverse
+from django.utils.formats import number_format
 from django.utils.text import slugify
-from django.utils.timezone import get_fixed_timezone
-from django.views.generic import FormView, TemplateView, View
+from django.views.generic import FormView, ListView, TemplateView, View
 
 
 @register.filter(name="dict_key")
@@ -23,16 +23,29 @@ def dict_key(d, k):
     return d.get(k, [])
 
 
-from .forms import AnswerForm, ProfileForm, ReviewForm, UploadZipFileForm, UserForm
-from .models import Answer, Question, QuizzSending
+from .forms import (
+    NB_ANSWERS,
+    AnswerForm,
+    ProfileForm,
+    QuizzSendingFilterForm,
+    ReviewForm,
+    UploadZipFileForm,
+    UserForm,
+)
+from .gradebook import Gradebook
+from .models import Answer, Group, Quizz, QuizzSending, StatisticsSnapshot
 from .models import ReviewAnswer as ReviewAnswerModel
-
-FetchedAnswer = namedtuple(
-    "FetchedAnswer",
-    ["email", "nb_points", "question", "quizz_sending", "chosen_answers"],
+from .snapshots import build_snapshot, get_snapshot, is_running, make_snapshot
+from .started import is_started
+from .statistics import (
+    build_statistics_snapshot,
+    cached_student_statistics,
+    detailed_csv_rows,
+    generate_qrcode,
+    is_closed,
+    sending_statistics,
+    thaw_statistics,
 )
-FetchedQuestion = namedtuple("FetchedQuestion", ["pk", "statement", "possible_answers"])
-FetchedPerson = namedtuple("FetchedPerson", ["email"])
 
 
 class AnswerAQuestion(LoginRequiredMixin, FormView):
@@ -49,8 +62,17 @@ class AnswerAQuestion(LoginRequiredMixin, FormView):
         self.date_for_url = self.date.strftime("%Y-%m-%d--%H-%M")
         return super().post(request, *args, **kwargs)
 
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs["person"] = self.request.user
+        kwargs["snapshot"] = get_snapshot(self.date_for_url)
+        return kwargs
+
     def form_valid(self, form):
-        form.add_answer_in_database()
+        if not form.add_answer_in_database():
+            messages.error(
+                self.request, "Une réponse a déjà été fournie à la question précédente."
+            )
         return super().form_valid(form)
 
     def form_invalid(self, form):
@@ -62,414 +84,384 @@ class AnswerAQuestion(LoginRequiredMixin, FormView):
         return reverse("form", kwargs={"date": self.date_for_url})
 
     def get_context_data(self, **kwargs):
-        # TODO better usage of ORM
         kwargs = super().get_context_data(**kwargs)
 
         kwargs["date_for_url"] = self.date_for_url
         kwargs["date"] = self.date
-        kwargs["email"] = self.request.user.email
+        kwargs["start_poll_interval"] = settings.QUIZZ_START_POLL_INTERVAL * 1000
         kwargs["form"] = self.get_form()
 
-        quizz_sending = (
-            QuizzSending.objects.filter(date=self.date).select_related("quizz").first()
-        )
-        if not quizz_sending:
-            messages.error(self.request, "Pas de quiz correspondant à cette date")
-            kwargs["finished"] = False
-            kwargs["nb_questions_left"] = 0
-            return kwargs
-        answers_from_email = (
-            Answer.objects.filter(quizz_sending=quizz_sending)
-            .select_related("person")
-            .filter(person__email=self.request.user.email)
-        )
-
-        quizz = quizz_sending.quizz
-
-        fetched_answers: Dict[int, FetchedAnswer] = {}
-        for answer in answers_from_email.all():
-            fetched_answers[answer.pk] = FetchedAnswer(
-                email=answer.person.email,
-                nb_points=answer.nb_points,
-                question=answer.question.pk,
-                quizz_sending=0,  # not used
-                chosen_answers="",  # not used
+        snapshot = get_snapshot(self.date_for_url)
+        if snapshot is None:
+            quizz_sending = (
+                QuizzSending.objects.filter(date=self.date)
+                .select_related("quizz", "group")
+                .first()
             )
-
-        fetched_questions: Dict[int, FetchedQuestion] = {}
-        for question in quizz.questions.all():
-            fetched_questions[question.pk] = FetchedQuestion(
-                pk=question.pk,
-                statement=question.statement_html,
-                possible_answers="\n".join(question.possible_answers_html),
+            if not quizz_sending:
+                messages.error(self.request, "Pas de quiz correspondant à cette date")
+                kwargs["finished"] = False
+                kwargs["nb_questions_left"] = 0
+                return kwargs
+            if is_running(quizz_sending):
+                snapshot = build_snapshot(quizz_sending)
+
+        if snapshot is not None:
+            quizz_sending = snapshot.quizz_sending
+            answered_question_ids = set(
+                Answer.objects.filter(
+                    quizz_sending=quizz_sending, person=self.request.user
+                )
+                .order_by()
+                .values_list("question", flat=True)
             )
-
-        unanswered_questions: List[FetchedQuestion] = []
-        for question in fetched_questions.values():
-            if any(
-                answer.question == question.pk for answer in fetched_answers.values()
-            ):
-                continue
-            unanswered_questions.append(question)
-
-        if unanswered_questions:
-            kwargs["finished"] = False
-            if quizz.random_question_order:
-                question = random.choice(unanswered_questions)
-            else:
-                question = unanswered_questions[0]
-            kwargs["question"] = Question.objects.get(pk=question.pk)
+            question, nb_questions_left = snapshot.next_question(
+                self.request.user.pk, answered_question_ids
+            )
+            if question is not None:
+                kwargs["question"] = question
+            kwargs["finished"] = question is None
         else:
-            kwargs["finished"] = True
+            quizz = quizz_sending.quizz
+            unanswered_questions = quizz_sending.unanswered_questions(self.request.user)
+            nb_questions_left = unanswered_questions.count()
+
+            if nb_questions_left:
+                kwargs["finished"] = False
+                order = "?" if quizz.random_question_order else "pk"
+                kwargs["question"] = unanswered_questions.order_by(order).first()
+            else:
+                kwargs["finished"] = True
 
         kwargs["quizz_sending"] = quizz_sending
-        kwargs["nb_questions_left"] = len(unanswered_questions)
+        kwargs["nb_questions_left"] = nb_questions_left
         return kwargs
 
 
-class Progress:
-    def __init__(self, value, max_value):
-        self.value = value
-        self.max_value = max_value
+class AnswerAQuizz(LoginRequiredMixin, View):
+    """Receive all the answers to a quizz at once, as JSON.
 
-    @property
-    def percentage(self):
-        return int(100 * self.value / self.max_value)
+    The body is {"answers": {"<question pk>": [<chosen indexes>], ...}} and
+    the response gives the errors of each question, empty if accepted.
+    """
 
-    @property
-    def note(self):
-        return self.percentage / 5
+    def post(self, request, *args, **kwargs):
+        date_for_url = kwargs["date"].strftime("%Y-%m-%d--%H-%M")
+        try:
+            answers = json.loads(request.body)["answers"]
+            answers = {int(pk): set(indexes) for pk, indexes in answers.items()}
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return JsonResponse({"error": "Réponses mal formées"}, status=400)
+
+        snapshot = get_snapshot(date_for_url)
+        if snapshot is None:
+            quizz_sending = (
+                QuizzSending.objects.filter(date=kwargs["date"])
+                .select_related("quizz", "group")
+                .first()
+            )
+            if not quizz_sending:
+                return JsonResponse(
+                    {"error": "Pas de quiz correspondant à cette date"}, status=404
+                )
+            if is_running(quizz_sending):
+                snapshot = build_snapshot(quizz_sending)
+            else:
+                snapshot = make_snapshot(quizz_sending)
+        quizz_sending = snapshot.quizz_sending
+        answered_question_ids = set(
+            Answer.objects.filter(quizz_sending=quizz_sending, person=request.user)
+            .order_by()
+            .values_list("question", flat=True)
+        )
+
+        results = {}
+        valid_forms = []
+        for question_pk, indexes in answers.items():
+            if not indexes <= set(range(NB_ANSWERS)):
+                results[question_pk] = ["Réponse invalide."]
+                continue
+            data = {"question": question_pk, "quizz_sending": quizz_sending.pk}
+            data.update({f"answer{index}": True for index in indexes})
+            form = AnswerForm(data, person=request.user, snapshot=snapshot)
+            if not form.is_valid():
+                results[question_pk] = [
+                    str(error) for errors in form.errors.values() for error in errors
+                ]
+            elif question_pk in answered_question_ids:
+                results[question_pk] = ["Une réponse a déjà été fournie."]
+            else:
+                valid_forms.append(form)
+
+        inserted = Answer.objects.record([form.answer for form in valid_forms])
+        inserted_question_ids = {answer.question_id for answer in inserted}
+        for form in valid_forms:
+            question_pk = form.cleaned_data["question"]
+            if question_pk in inserted_question_ids:
+                results[question_pk] = []
+            else:
+                results[question_pk] = ["Une réponse a déjà été fournie."]
+        return JsonResponse({"results": results})
 
-    @property
-    def reverse_percentage(self):
-        return 100 - self.percentage
 
+class WaitForStart(View):
+    """Whether the quizz sending is started, polled by the waiting students.
 
-class Statistics:
-    def __init__(self, text, value, max_value, extra_text=""):
-        self.text = text
-        self.extra_text = extra_text
-        self.progress = Progress(value, max_value)
+    Open to anyone, so that a poll reads neither the session nor the user.
+    """
 
+    def get(self, request, *args, **kwargs):
+        date_for_url = kwargs["date"].strftime("%Y-%m-%d--%H-%M")
+        started = is_started(kwargs["date"], date_for_url)
+        if started is None:
+            return JsonResponse(
+                {"error": "Pas de quiz correspondant à cette date"}, status=404
+            )
+        return JsonResponse({"started": started})
 
-def user2name(email):
-    user = User.objects.filter(email=email).first()
-    if user.first_name and user.last_name:
-        return f"{user.last_name.upper()} {user.first_name.title()}"
-    return f"{user.username.upper()} {user.email}"
 
+class SendingStatisticsMixin:
+    """Statistics of the sending at the date of the URL, frozen once it is over."""
 
-class QuizzStatistics(TemplateView):
-    template_name = "quizz/statistics.html"
+    def get_quizz_sending(self, date):
+        return (
+            QuizzSending.objects.filter(date=date)
+            .select_related("quizz", "group", "statistics_snapshot")
+            .first()
+        )
 
     def generate_qrcode(self, date):
         date_str = str(date).replace(":", "-").replace(" ", "--")
         date_str = date_str[:-3]  # remove seconds, ugly isn't it?
-        url = self.request.build_absolute_uri(reverse("form", args=[date_str]))
-        qrcode_url = f"qrcodes/{date_str}.png"
-        fss = FileSystemStorage()
-        filepath = fss.path(qrcode_url)
-        if not fss.exists(filepath):
-            img = qrcode.make(url, error_correction=qrcode.constants.ERROR_CORRECT_H)
-            img.save(filepath)
-        return fss.url(qrcode_url)
+        return generate_qrcode(date_str, self.request.build_absolute_uri)
+
+    def get_statistics_snapshot(self, quizz_sending):
+        try:
+            return quizz_sending.statistics_snapshot
+        except StatisticsSnapshot.DoesNotExist:
+            qrcode_url = generate_qrcode(
+                quizz_sending.date_for_url, self.request.build_absolute_uri
+            )
+            return build_statistics_snapshot(quizz_sending, qrcode_url)
+
+
+class QuizzStatistics(SendingStatisticsMixin, TemplateView):
+    template_name = "quizz/statistics.html"
 
     def get_context_data(self, **kwargs):
         kwargs = super().get_context_data(**kwargs)
-        kwargs["qrcode"] = self.generate_qrcode(date=kwargs["date"])
-        quizz_sending: QuizzSending = (
-            QuizzSending.objects.filter(date=kwargs["date"])
-            .select_related("quizz")
-            .select_related("group")
-            .prefetch_related("quizz__questions")
-            .prefetch_related("group__persons")
-            .prefetch_related("answers")
-            .prefetch_related("answers__person")
-            .prefetch_related("answers__question")
-            .first()
-        )
+        quizz_sending = self.get_quizz_sending(kwargs["date"])
         if not quizz_sending:
+            kwargs["qrcode"] = self.generate_qrcode(date=kwargs["date"])
             messages.error(self.request, "Pas de quizz correspondant à cette date")
             kwargs["quizz_sending"] = None
             return kwargs
-        quizz = quizz_sending.quizz
-        group = quizz_sending.group
-
-        fetched_questions: Dict[int, FetchedQuestion] = {}
-        for question in quizz.questions.all():
-            fetched_questions[question.pk] = FetchedQuestion(
-                pk=question.pk,
-                statement=question.statement_html,
-                possible_answers="\n".join(question.possible_answers_html),
-            )
-        fetched_persons: Dict[str, FetchedPerson] = {}
-        for person in group.persons.all():
-            fetched_persons[person.email] = FetchedPerson(email=person.email)
-        fetched_answers: Dict[int, FetchedAnswer] = {}
-        for answer in quizz_sending.answers.all():
-            fetched_answers[answer.pk] = FetchedAnswer(
-                email=answer.person.email,
-                nb_points=answer.nb_points,
-                question=answer.question.pk,
-                quizz_sending=0,  # not used
-                chosen_answers=answer.answers,
-            )
 
-        nb_questions = quizz.nb_questions
-        nb_persons = quizz_sending.nb_persons
         kwargs["quizz_sending"] = quizz_sending
-        kwargs["total_questions"] = Progress(
-            value=len(fetched_answers), max_value=nb_questions * nb_persons
-        )
-
-        nb_answers_per_student = {}
-        for answer in fetched_answers.values():
-            nb_answers_per_student[answer.email] = (
-                nb_answers_per_student.get(answer.email, 0) + 1
-            )
-
-        persons_answered_questions = []
-        for email in fetched_persons:
-            persons_answered_questions.append(
-                Statistics(
-                    text=user2name(email),
-                    value=nb_answers_per_student.get(email, 0),
-                    max_value=nb_questions,
-                )
-            )
-        persons_answered_questions.sort(key=lambda p: (p.progress.value, p.text))
-        kwargs["persons_answered_questions"] = persons_answered_questions
-
-        persons_correct_questions = []
-        for email in fetched_persons:
-            answers = (
-                answer for answer in fetched_answers.values() if answer.email == email
-            )
-            nb_points = sum(answer.nb_points for answer in answers)
-            persons_correct_questions.append(
-                Statistics(
-                    text=user2name(email), value=nb_points, max_value=nb_questions
-                )
-            )
-        persons_correct_questions.sort(key=lambda p: p.text)
-        kwargs["persons_correct_questions"] = persons_correct_questions
-
-        questions_status = []
-        questions_answers_stats = {}
-        for question in fetched_questions.values():
-            answers = [
-                answer
-                for answer in fetched_answers.values()
-                if answer.question == question.pk
-            ]
-            nb_points = sum(answer.nb_points for answer in answers)
-            questions_status.append(
-                Statistics(
-                    text=question.statement,
-                    value=nb_points,
-                    max_value=nb_persons,
-                    extra_text=question.possible_answers,
-                )
-            )
-            questions_answers_stats[question.statement] = []
-            nb_answers = len(answers)
-            for index, possible_answer in enumerate(
-                question.possible_answers.splitlines()
-            ):
-                questions_answers_stats[question.statement].append(
-                    Statistics(
-                        text=possible_answer,
-                        value=sum(
-                            1
-                            for answer in answers
-                            if str(index) in answer.chosen_answers
-                        ),
-                        max_value=nb_answers,
-                    )
-                )
-        kwargs["questions"] = questions_status
-        if datetime.now(tz=get_fixed_timezone(1)) > quizz_sending.end_date:
-            kwargs["questions_answers_stats"] = questions_answers_stats
+        if is_closed(quizz_sending):
+            snapshot = self.get_statistics_snapshot(quizz_sending)
+            kwargs["qrcode"] = snapshot.qrcode
+            kwargs.update(thaw_statistics(snapshot.context))
         else:
-            kwargs["questions_answers_stats"] = {}
-
+            kwargs["qrcode"] = self.generate_qrcode(date=kwargs["date"])
+            kwargs.update(
+                sending_statistics(quizz_sending, with_answers_stats=False, live=True)
+            )
         return kwargs
 
 
-class QuizzStatisticsCSV(TemplateView):
+class QuizzStatisticsCSV(SendingStatisticsMixin, TemplateView):
     template_name = "quizz/statistics.csv"
 
+    def get(self, request, *args, **kwargs):
+        self.quizz_sending = self.get_quizz_sending(kwargs["date"])
+        if self.quizz_sending and is_closed(self.quizz_sending):
+            snapshot = self.get_statistics_snapshot(self.quizz_sending)
+            return HttpResponse(snapshot.csv, content_type=self.content_type)
+        return super().get(request, *args, **kwargs)
+
     def get_context_data(self, **kwargs):
         kwargs = super().get_context_data(**kwargs)
-        quizz_sending = (
-            QuizzSending.objects.filter(date=kwargs["date"])
-            .select_related("quizz")
-            .select_related("group")
-            .prefetch_related("quizz__questions")
-            .prefetch_related("group__persons")
-            .prefetch_related("answers")
-            .prefetch_related("answers__person")
-            .prefetch_related("answers__question")
-            .first()
-        )
+        quizz_sending = self.quizz_sending
         if not quizz_sending:
             messages.error(self.request, "Pas de quizz correspondant à cette date")
             kwargs["quizz_sending"] = None
             return kwargs
-        quizz = quizz_sending.quizz
-        group = quizz_sending.group
-
-        fetched_persons = {}
-        for person in group.persons.all():
-            fetched_persons[person.email] = FetchedPerson(email=person.email)
-        fetched_answers = {}
-        for answer in quizz_sending.answers.all():
-            fetched_answers[answer.pk] = FetchedAnswer(
-                email=answer.person.email,
-                nb_points=answer.nb_points,
-                question=answer.question.pk,
-                quizz_sending=0,  # not used
-                chosen_answers="",  # not used
-            )
 
-        nb_questions = quizz.nb_questions
-        kwargs["nb_questions"] = nb_questions
-        len(fetched_persons)
         kwargs["quizz_sending"] = quizz_sending
-
-        persons_correct_questions = []
-        for email in fetched_persons:
-            answers = (
-                answer for answer in fetched_answers.values() if answer.email == email
-            )
-            nb_points = sum(answer.nb_points for answer in answers)
-            persons_correct_questions.append(
-                Statistics(
-                    text=user2name(email),
-                    value=nb_points,
-                    max_value=nb_questions,
-                )
-            )
-        persons_correct_questions.sort(key=lambda p: p.text)
-        kwargs["persons_correct_questions"] = persons_correct_questions
+        kwargs.update(
+            sending_statistics(quizz_sending, with_answers_stats=False, live=True)
+        )
         return kwargs
 
 
-class StudentStatistics(LoginRequiredMixin, TemplateView):
-    template_name = "quizz/student_statistics.html"
+class Echo:
+    """File-like object giving back what is written, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+class QuizzStatisticsDetailedCSV(View):
+    """Answers of each student, only for the staff."""
+
+    def get(self, request, date):
+        if not request.user.is_staff:
+            raise Http404("Réponses détaillées réservées aux enseignants")
+        quizz_sending = (
+            QuizzSending.objects.filter(date=date)
+            .select_related("quizz", "group")
+            .first()
+        )
+        if not quizz_sending:
+            raise Http404("Pas de quizz correspondant à cette date")
+        writer = csv.writer(Echo(), delimiter=";")
+        response = StreamingHttpResponse(
+            (writer.writerow(row) for row in detailed_csv_rows(quizz_sending)),
+            content_type="text/csv",
+        )
+        filename = f"quizz-{quizz_sending.date_for_url}.csv"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+class GroupGradebook(TemplateView):
+    template_name = "quizz/group_gradebook.html"
 
     def get_context_data(self, **kwargs):
         kwargs = super().get_context_data(**kwargs)
-        person = self.request.user
-
-        fetched_answers = {}
-        quizz_sending_ids = set()
-        for answer in (
-            Answer.objects.select_related("person")
-            .select_related("question")
-            .select_related("quizz_sending")
-            .filter(person=person)
-            .all()
-        ):
-            if answer.question.pk not in fetched_answers:
-                fetched_answers[answer.question.pk] = []
-            fetched_answers[answer.question.pk].append(
-                FetchedAnswer(
-                    email=answer.person.email,
-                    nb_points=answer.nb_points,
-                    question=answer.question.pk,
-                    quizz_sending=answer.quizz_sending.pk,
-                    chosen_answers="\n".join(answer.chosen_answers_html),
-                )
-            )
-            if answer.quizz_sending.started:
-                quizz_sending_ids.add(answer.quizz_sending.pk)
+        group = get_object_or_404(Group, slug=kwargs["group"])
+        kwargs["group"] = group
+        kwargs["gradebook"] = Gradebook(group)
+        return kwargs
 
-        quizz_sendings_status = {}
-        for quizz_sending_pk in sorted(quizz_sending_ids, reverse=True):
-            # TODO merge request of each quizz_sending
-            quizz_sending = (
-                QuizzSending.objects.select_related("quizz")
-                .prefetch_related("quizz__questions")
-                .get(pk=quizz_sending_pk)
-            )
-            quizz_sendings_status[quizz_sending] = []
-            total_points = 0
-            max_total_points = 0
-
-            for question in quizz_sending.quizz.questions.all():
-                answers = [
-                    answer
-                    for answer in fetched_answers.get(question.pk, [])
-                    if answer.quizz_sending == quizz_sending_pk
+
+class GroupGradebookCSV(View):
+    def get(self, request, group):
+        group = get_object_or_404(Group, slug=group)
+        gradebook = Gradebook(group)
+        response = HttpResponse(content_type="text/csv")
+        response["Content-Disposition"] = (
+            f'attachment; filename="notes-{group.slug}.csv"'
+        )
+        writer = csv.writer(response, delimiter=";")
+        writer.writerow(
+            ["Nom"]
+            + [
+                f"{quizz_sending.quizz.name} {quizz_sending.date_for_url}"
+                for quizz_sending in gradebook.quizz_sendings
+            ]
+            + ["Moyenne", "Médiane", "Rang"]
+        )
+        for name, grades, mean, median, rank in gradebook.students():
+            writer.writerow(
+                [name]
+                + [number_format(grade, decimal_pos=2) for grade in grades]
+                + [
+                    number_format(mean, decimal_pos=2),
+                    number_format(median, decimal_pos=2),
+                    rank,
                 ]
-                nb_points = sum(answer.nb_points for answer in answers)
-                total_points += nb_points
-                max_total_points += 1
-                if datetime.now(tz=get_fixed_timezone(1)) > quizz_sending.end_date:
-                    answers_text = "\n".join(
-                        answer.chosen_answers for answer in answers
-                    )
-                else:
-                    answers_text = ""
-                quizz_sendings_status[quizz_sending].append(
-                    Statistics(
-                        text=question.statement_html,
-                        value=nb_points,
-                        max_value=1,
-                        extra_text=answers_text,
-                    )
-                )
-            quizz_sendings_status[quizz_sending].insert(
-                0,
-                Statistics(
-                    text="Note du quiz",
-                    value=total_points,
-                    max_value=max_total_points,
-                ),
             )
-        kwargs["quizzes"] = quizz_sendings_status
+        sendings = list(gradebook.sendings())
+        writer.writerow(
+            ["Moyenne"]
+            + [number_format(mean, decimal_pos=2) for _, mean, _ in sendings]
+        )
+        writer.writerow(
+            ["Écart type"]
+            + [number_format(std, decimal_pos=2) for _, _, std in sendings]
+        )
+        return response
+
+
+class StudentStatistics(LoginRequiredMixin, TemplateView):
+    template_name = "quizz/student_statistics.html"
+    paginate_by = 5  # quizzes per page, the older ones are loaded on demand
+
+    def get_page(self):
+        try:
+            return max(1, int(self.request.GET.get("page", 1)))
+        except ValueError:
+            return 1
+
+    def get_context_data(self, **kwargs):
+        kwargs = super().get_context_data(**kwargs)
+        page = self.get_page()
+        quizzes, has_older = cached_student_statistics(
+            self.request.user,
+            offset=(page - 1) * self.paginate_by,
+            limit=self.paginate_by,
+        )
+        kwargs["quizzes"] = quizzes
+        kwargs["next_page"] = page + 1 if has_older else None
         return kwargs
 
 
+class StudentStatisticsFragment(StudentStatistics):
+    """Older quizzes of StudentStatistics, appended to its page."""
+
+    template_name = "quizz/student_statistics_quizzes.html"
+
+
 class HelpView(TemplateView):
     template_name = "quizz/help.html"
 
     def get_context_data(self, **kwargs):
         kwargs = super().get_context_data(**kwargs)
         if self.request.user.is_authenticated:
-            groups = self.request.user.pyquizz_groups.all()
-            urls = []
-            for group in groups:
-                latest_quizz_sending = QuizzSending.objects.filter(group=group).latest(
-                    "date"
-                )
-                urls.append(
-                    (
-                        latest_quizz_sending.get_absolute_url(),
-                        latest_quizz_sending.quizz.name,
-                    )
+            latest_date = (
+                QuizzSending.objects.filter(group=OuterRef("group"))
+                .order_by("-date")
+                .values("date")[:1]
+            )
+            quizz_sendings = (
+                QuizzSending.objects.filter(
+                    group__persons=self.request.user, date=Subquery(latest_date)
                 )
-            kwargs["quizzes"] = urls
+                .select_related("quizz")
+                .order_by("group__name")
+            )
+            kwargs["quizzes"] = [
+                (quizz_sending.get_absolute_url(), quizz_sending.quizz.name)
+                for quizz_sending in quizz_sendings
+            ]
         else:
             kwargs["quizzes"] = []
         return kwargs
 
 
-class QuizzStatisticsList(TemplateView):
+class QuizzStatisticsList(ListView):
     template_name = "quizz/quizz_statistics_list.html"
+    context_object_name = "quizz_sendings"
+    paginate_by = 50
+
+    def get_queryset(self):
+        self.filter_form = QuizzSendingFilterForm(self.request.GET or None)
+        quizz_sendings = self.filter_form.filter(QuizzSending.objects.all())
+        return (
+            quizz_sendings.select_related("quizz", "group")
+            .annotate(
+                nb_questions=Subquery(
+                    Quizz.questions.through.objects.filter(quizz=OuterRef("quizz"))
+                    .order_by()
+                    .values("quizz")
+                    .annotate(count=Count("pk"))
+                    .values("count")
+                ),
+                mean_grade=20.0
+                * F("total_points")
+                / NullIf(F("nb_participants") * F("nb_questions"), 0),
+            )
+            .order_by("group__name", "date")
+        )
 
     def get_context_data(self, **kwargs):
         kwargs = super().get_context_data(**kwargs)
-        quizz_sendings = QuizzSending.objects.order_by("-date").select_related(
-            "quizz", "group"
-        )
-        sendings = defaultdict(list)
-        for quizz_sending in sorted(
-            quizz_sendings, key=lambda qs: (qs.group.name, qs.date.isoformat())
-        ):
-            sendings[quizz_sending.group.name].append(quizz_sending)
-        kwargs["quizz_sendings"] = sendings
+        kwargs["filter_form"] = self.filter_form
+        query = self.request.GET.copy()
+        query.pop("page", None)
+        kwargs["filter_query"] = query.urlencode()
         return kwargs
 
 
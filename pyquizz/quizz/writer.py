@@ -0,0 +1,142 @@
+"""Group commit of the answers sent by concurrent requests.
+
+SQLite allows a single writer: instead of one transaction per request
+fighting for the lock, the requests hand their answer to a writer thread
+which inserts everything received during a few milliseconds in a single
+transaction. Each request waits until its answer is committed.
+
+Enabled with the QUIZZ_GROUP_COMMIT setting.
+"""
+
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Answer
+
+
+class PendingAnswer:
+    def __init__(self, answer):
+        self.answer = answer
+        self.inserted = False
+        self.error = None
+        self.done = threading.Event()
+
+    @property
+    def key(self):
+        answer = self.answer
+        return answer.quizz_sending_id, answer.person_id, answer.question_id
+
+
+class AnswerWriter:
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def interval(self):
+        return getattr(settings, "QUIZZ_GROUP_COMMIT_INTERVAL", 0.005)
+
+    @property
+    def max_batch(self):
+        return getattr(settings, "QUIZZ_GROUP_COMMIT_MAX_BATCH", 100)
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name="quizz-answer-writer", daemon=True
+                )
+                self.thread.start()
+
+    def stop(self):
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                self.queue.put(None)
+                self.thread.join()
+            self.thread = None
+
+    def submit(self, answer):
+        """Insert the answer in the next batch, return False if already answered."""
+        self.start()
+        pending = PendingAnswer(answer)
+        self.queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.inserted
+
+    def next_batch(self):
+        first = self.queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                pending = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if pending is None:
+                self.queue.put(None)  # stop after this batch
+                break
+            batch.append(pending)
+        return batch
+
+    def run(self):
+        try:
+            while (batch := self.next_batch()) is not None:
+                self.write(batch)
+        finally:
+            connection.close()
+
+    def write(self, batch):
+        # an answer sent twice in the batch gets the outcome of the first one
+        first = {}
+        for pending in batch:
+            first.setdefault(pending.key, pending)
+        unique = list(first.values())
+        try:
+            if not self.record(unique) and len(unique) > 1:
+                # insert the answers one by one, so that the faulty one
+                # does not fail the requests of the others
+                for pending in unique:
+                    pending.error = None
+                    self.record([pending])
+            for pending in batch:
+                if first[pending.key] is not pending:
+                    pending.error = first[pending.key].error
+        finally:
+            for pending in batch:
+                pending.done.set()
+
+    def record(self, batch):
+        """Insert the answers of the batch, return False if it failed."""
+        try:
+            inserted = Answer.objects.record([pending.answer for pending in batch])
+        except Exception as error:  # noqa: BLE001 (given back to the requests)
+            connection.close()
+            for pending in batch:
+                pending.error = error
+            return False
+        inserted_ids = {id(answer) for answer in inserted}
+        for pending in batch:
+            pending.inserted = id(pending.answer) in inserted_ids
+        return True
+
+
+answer_writer = AnswerWriter()
+
+
+def save_answer(answer):
+    """Insert the answer, return False if the question was already answered."""
+    if getattr(settings, "QUIZZ_GROUP_COMMIT", False):
+        return answer_writer.submit(answer)
+    return bool(Answer.objects.record([answer]))